@@ -1,3 +1,5 @@
+import asyncio
+import sys
 from argparse import ArgumentParser
 
 from . import __version__
@@ -5,10 +7,69 @@ from . import __version__
 __all__ = ["main"]
 
 
+def monitor(args):
+    # Only import v2 and its CA libraries if needed
+    from .v2.core import SignalTimeoutError
+    from .v2.pvstats import NotConnectedError, run_monitor
+
+    try:
+        asyncio.run(
+            run_monitor(
+                args.pvs,
+                args.device,
+                args.duration,
+                args.interval,
+                args.coalesce,
+                args.timeout,
+            )
+        )
+    except KeyboardInterrupt:
+        # The summary has already been printed
+        pass
+    except (NotConnectedError, SignalTimeoutError) as e:
+        sys.exit(f"ophyd monitor: {e}")
+
+
 def main(args=None):
     parser = ArgumentParser()
     parser.add_argument("--version", action="version", version=__version__)
+    subparsers = parser.add_subparsers()
+    monitor_parser = subparsers.add_parser(
+        "monitor",
+        help="Monitor PVs, showing update rates, jitter and latency",
+    )
+    monitor_parser.set_defaults(func=monitor)
+    monitor_parser.add_argument(
+        "pvs", nargs="+", help="PVs to monitor, or device prefixes if --device"
+    )
+    monitor_parser.add_argument(
+        "--device",
+        help="Device factory like ophyd_epics_devices.motor:motor to make a "
+        "device from each prefix, monitoring all its readable signals",
+    )
+    monitor_parser.add_argument(
+        "--duration", type=float, help="Seconds to monitor for, default forever"
+    )
+    monitor_parser.add_argument(
+        "--interval",
+        type=float,
+        default=1.0,
+        help="Seconds between live displays, 0 to only show the summary",
+    )
+    monitor_parser.add_argument(
+        "--coalesce",
+        action="store_true",
+        help="Measure updates as a coalesced monitor callback would see them",
+    )
+    monitor_parser.add_argument(
+        "--timeout",
+        type=float,
+        default=10.0,
+        help="Seconds to wait for PVs to connect",
+    )
     args = parser.parse_args(args)
+    if hasattr(args, "func"):
+        args.func(args)
 
 
 # test with: pipenv run python -m ophyd
@@ -0,0 +1,89 @@
+import asyncio
+import inspect
+from typing import Any, Awaitable, Dict, Tuple, TypeVar, Union, cast
+
+from bluesky.protocols import Descriptor, Movable, Readable, Reading
+from bluesky.run_engine import call_in_bluesky_event_loop
+
+from .core import AsyncStatus, SignalR, SignalW
+
+T = TypeVar("T")
+
+ReadableOrSignal = Union[Readable, SignalR]
+MovableOrSignal = Union[Movable, SignalW]
+
+
+async def _gather_dict(awaitables: Dict[str, Awaitable[T]]) -> Dict[str, Any]:
+    results = await asyncio.gather(*awaitables.values(), return_exceptions=True)
+    return dict(zip(awaitables, results))
+
+
+def call_many(awaitables: Dict[str, Awaitable[T]]) -> Dict[str, Union[T, Exception]]:
+    """Run awaitables concurrently in a single hand off to the bluesky event loop,
+    returning their results by name. A failing awaitable has its exception in
+    place of its result, so one error doesn't hide the others"""
+    return call_in_bluesky_event_loop(_gather_dict(awaitables))
+
+
+async def _maybe_await(result):
+    # ophyd.v2 devices are async, but allow sync Readables too
+    if inspect.isawaitable(result):
+        return await result
+    return result
+
+
+async def _read(name: str, obj: ReadableOrSignal) -> Dict[str, Reading]:
+    if isinstance(obj, SignalR):
+        return {name: await obj.get_reading()}
+    return await _maybe_await(obj.read())
+
+
+async def _describe(name: str, obj: ReadableOrSignal) -> Dict[str, Descriptor]:
+    if isinstance(obj, SignalR):
+        return {name: await obj.get_descriptor()}
+    return await _maybe_await(obj.describe())
+
+
+async def _get_value(obj: ReadableOrSignal) -> Any:
+    if isinstance(obj, SignalR):
+        return await obj.get_value()
+    values = {k: r["value"] for k, r in (await _maybe_await(obj.read())).items()}
+    # Devices that read a single value, like SignalDevice, return it bare
+    if len(values) == 1:
+        return list(values.values())[0]
+    return values
+
+
+async def _put(obj: MovableOrSignal, value) -> None:
+    if isinstance(obj, SignalW):
+        await obj.put(value)
+    else:
+        # ophyd.v2 devices return an AsyncStatus, which can be awaited
+        await cast(AsyncStatus, obj.set(value))
+
+
+def read_many(
+    objs: Dict[str, ReadableOrSignal]
+) -> Dict[str, Union[Dict[str, Reading], Exception]]:
+    """Read devices and signals concurrently, a signal being read as {name:
+    reading}. Monitored signals return their cached readings"""
+    return call_many({name: _read(name, obj) for name, obj in objs.items()})
+
+
+def describe_many(
+    objs: Dict[str, ReadableOrSignal]
+) -> Dict[str, Union[Dict[str, Descriptor], Exception]]:
+    """Describe devices and signals concurrently"""
+    return call_many({name: _describe(name, obj) for name, obj in objs.items()})
+
+
+def get_values(objs: Dict[str, ReadableOrSignal]) -> Dict[str, Any]:
+    """Get the values of devices and signals concurrently. A device reading a
+    single value returns it, otherwise a dict of values"""
+    return call_many({name: _get_value(obj) for name, obj in objs.items()})
+
+
+def put_many(targets: Dict[str, Tuple[MovableOrSignal, Any]]) -> Dict[str, Any]:
+    """Concurrently put each (signal, value) or set each (device, value) in
+    targets, returning when all are done. Successful puts return None"""
+    return call_many({name: _put(obj, value) for name, (obj, value) in targets.items()})
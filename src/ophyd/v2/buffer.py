@@ -0,0 +1,54 @@
+from typing import Type
+
+import numpy as np
+from bluesky.protocols import Reading
+
+
+class ReadingBuffer:
+    """Preallocated NumPy buffer of values and timestamps that doubles in size
+    when it fills up, so appending from a monitor callback is cheap"""
+
+    def __init__(self, capacity: int = 1024, dtype: Type = float):
+        assert capacity > 0, f"Capacity {capacity} must be positive"
+        self._values = np.empty(capacity, dtype=dtype)
+        self._timestamps = np.empty(capacity, dtype=np.float64)
+        self._length = 0
+
+    def __len__(self) -> int:
+        return self._length
+
+    @property
+    def capacity(self) -> int:
+        return len(self._values)
+
+    @property
+    def values(self) -> np.ndarray:
+        """View of the values appended so far"""
+        return self._values[: self._length]
+
+    @property
+    def timestamps(self) -> np.ndarray:
+        """View of the timestamps appended so far"""
+        return self._timestamps[: self._length]
+
+    def _grow(self):
+        capacity = self.capacity * 2
+        values = np.empty(capacity, dtype=self._values.dtype)
+        values[: self._length] = self.values
+        timestamps = np.empty(capacity, dtype=np.float64)
+        timestamps[: self._length] = self.timestamps
+        self._values, self._timestamps = values, timestamps
+
+    def append(self, value, timestamp: float):
+        if self._length == self.capacity:
+            self._grow()
+        self._values[self._length] = value
+        self._timestamps[self._length] = timestamp
+        self._length += 1
+
+    def append_reading(self, reading: Reading):
+        self.append(reading["value"], reading["timestamp"])
+
+    def clear(self):
+        # Keep the allocated arrays so the next fill doesn't need to grow
+        self._length = 0
@@ -3,28 +3,40 @@ from __future__ import annotations
 import asyncio
 import logging
 import sys
+import threading
 from abc import ABC, abstractmethod
+from collections import deque
+from concurrent.futures import Executor, Future
 from typing import (
     Any,
     AsyncGenerator,
     Awaitable,
     Callable,
     ClassVar,
+    Deque,
     Dict,
     Generic,
+    Iterable,
+    Iterator,
     List,
+    Mapping,
     Optional,
+    Sequence,
     Set,
+    Tuple,
     TypeVar,
+    Union,
     cast,
 )
 
+import numpy as np
 from bluesky.protocols import (
     Descriptor,
     Movable,
     Readable,
     Reading,
     Status,
+    Stoppable,
     Subscribable,
 )
 from bluesky.run_engine import call_in_bluesky_event_loop
@@ -34,6 +46,31 @@ T = TypeVar("T")
 
 Callback = Callable[[T], None]
 
+# How many updates an off loop monitor callback can fall behind
+DEFAULT_QUEUE_SIZE = 1000
+
+# How long to wait for a get from a signal before giving up
+DEFAULT_TIMEOUT = 10.0
+
+
+class SignalTimeoutError(asyncio.TimeoutError):
+    """Raised when signals don't respond within their timeout"""
+
+    def __init__(self, sources: Sequence[str], timeout: Optional[float]):
+        self.sources = list(sources)
+        super().__init__(f"Timeout after {timeout}s waiting for {', '.join(sources)}")
+
+
+async def wait_for_signal(source: str, awaitable: Awaitable[T], timeout) -> T:
+    """Await awaitable, raising SignalTimeoutError naming source if it takes
+    longer than timeout seconds. A timeout of None waits forever"""
+    if timeout is None:
+        return await awaitable
+    try:
+        return await asyncio.wait_for(awaitable, timeout)
+    except asyncio.TimeoutError:
+        raise SignalTimeoutError([source], timeout) from None
+
 
 class AsyncStatus(Status, Generic[T]):
     "Convert asyncio Task to bluesky Status interface"
@@ -86,6 +123,100 @@ class AsyncStatus(Status, Generic[T]):
             self._watchers.append(watcher)
 
 
+# Moves in progress, and the devices that are doing them
+_moving: Dict[AsyncStatus, Stoppable] = {}
+
+
+def register_move(status: AsyncStatus[T], device: Stoppable) -> AsyncStatus[T]:
+    """Track status as a move of device until it is done, so stop_all() can
+    stop it"""
+    _moving[status] = device
+    status.task.add_done_callback(lambda _: _moving.pop(status, None))
+    return status
+
+
+def _stop_devices(devices: Iterable[Stoppable], success: bool) -> List[asyncio.Task]:
+    tasks = []
+    for device in devices:
+        ret = device.stop(success=success)
+        if asyncio.iscoroutine(ret):
+            tasks.append(asyncio.create_task(ret))
+    return tasks
+
+
+async def _send_stops(devices: Iterable[Stoppable], success: bool):
+    await asyncio.gather(*_stop_devices(devices, success))
+
+
+def stop_all(success=False) -> List[Union[asyncio.Task, Future]]:
+    """Stop every device with a move in progress.
+
+    All the stops are scheduled in the same event loop tick. Called from the
+    event loop of the moves this returns their tasks, which can be awaited if
+    the caller wants to know they were sent. Called from another thread, like
+    an IPython abort, the stops are sent to that loop and a concurrent Future
+    is returned that is done when they have been sent"""
+    by_loop: Dict[asyncio.AbstractEventLoop, Set[Stoppable]] = {}
+    for status, device in list(_moving.items()):
+        by_loop.setdefault(status.task.get_loop(), set()).add(device)
+    try:
+        running: Optional[asyncio.AbstractEventLoop] = asyncio.get_running_loop()
+    except RuntimeError:
+        running = None
+    sent: List[Union[asyncio.Task, Future]] = []
+    for loop, devices in by_loop.items():
+        if loop is running:
+            sent += _stop_devices(devices, success)
+        else:
+            sent.append(
+                asyncio.run_coroutine_threadsafe(_send_stops(devices, success), loop)
+            )
+    return sent
+
+
+class CompactReading(Mapping[str, Any]):
+    """Reading that keeps its fields in slots, and only makes a dict if asked.
+
+    Behaves as a read-only Mapping, so can be passed anywhere a Reading is
+    expected"""
+
+    __slots__ = ("value", "timestamp", "alarm_severity", "_dict")
+
+    def __init__(self, value, timestamp: float, alarm_severity: Optional[int] = None):
+        self.value = value
+        self.timestamp = timestamp
+        self.alarm_severity = alarm_severity
+        self._dict: Optional[Dict[str, Any]] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        if self._dict is None:
+            self._dict = dict(value=self.value, timestamp=self.timestamp)
+            if self.alarm_severity is not None:
+                self._dict["alarm_severity"] = self.alarm_severity
+        return self._dict
+
+    def __getitem__(self, key: str) -> Any:
+        if key == "value":
+            return self.value
+        elif key == "timestamp":
+            return self.timestamp
+        elif key == "alarm_severity" and self.alarm_severity is not None:
+            return self.alarm_severity
+        raise KeyError(key)
+
+    def __iter__(self) -> Iterator[str]:
+        yield "value"
+        yield "timestamp"
+        if self.alarm_severity is not None:
+            yield "alarm_severity"
+
+    def __len__(self) -> int:
+        return 2 if self.alarm_severity is None else 3
+
+    def __repr__(self) -> str:
+        return repr(self.to_dict())
+
+
 def _fail(self, other, *args, **kwargs):
     if isinstance(other, Signal):
         raise ValueError(
@@ -100,6 +231,99 @@ class Monitor(Protocol):
         ...
 
 
+class OffLoopCallback(Generic[T]):
+    """Wrap a callback so it is called from an Executor rather than the event loop.
+
+    Updates are delivered in order by at most one job at a time. If the callback
+    falls more than queue_size updates behind then the oldest are dropped"""
+
+    def __init__(self, callback: Callback[T], executor: Executor, queue_size: int):
+        self._callback = callback
+        self._executor = executor
+        self._queue: Deque[T] = deque(maxlen=queue_size)
+        self._lock = threading.Lock()
+        self._draining = False
+        self.dropped = 0
+
+    def __call__(self, value: T):
+        with self._lock:
+            if len(self._queue) == self._queue.maxlen:
+                self.dropped += 1
+            self._queue.append(value)
+            if self._draining:
+                return
+            self._draining = True
+        self._executor.submit(self._drain)
+
+    def _drain(self):
+        while True:
+            with self._lock:
+                if not self._queue:
+                    self._draining = False
+                    return
+                value = self._queue.popleft()
+            try:
+                self._callback(value)
+            except Exception:
+                logging.exception(f"Off loop callback {self._callback} failed")
+
+    def close(self):
+        with self._lock:
+            self._queue.clear()
+
+
+class CoalescingCallback(Generic[T]):
+    """Wrap a callback so it is only called with the latest of the updates that
+    arrive in one event loop iteration, or within interval seconds if given.
+
+    Intermediate updates are deliberately dropped"""
+
+    def __init__(self, callback: Callback[T], interval: Optional[float] = None):
+        self._callback = callback
+        self._interval = interval
+        self._latest: Any = None
+        self._handle: Optional[asyncio.Handle] = None
+
+    def __call__(self, value: T):
+        self._latest = value
+        if self._handle is None:
+            loop = asyncio.get_running_loop()
+            if self._interval:
+                self._handle = loop.call_later(self._interval, self._flush)
+            else:
+                self._handle = loop.call_soon(self._flush)
+
+    def _flush(self):
+        self._handle = None
+        self._callback(self._latest)
+
+    def close(self):
+        if self._handle:
+            self._handle.cancel()
+            self._handle = None
+
+
+def wrap_callback(
+    callback: Callback[T],
+    executor: Optional[Executor],
+    queue_size: int,
+    coalesce: Union[bool, float],
+) -> Tuple[Callback[T], List[Monitor]]:
+    """Wrap callback in the requested delivery options, returning it with the
+    wrappers that need closing when the monitor is"""
+    wrappers: List[Monitor] = []
+    if executor is not None:
+        off_loop = OffLoopCallback(callback, executor, queue_size)
+        wrappers.append(off_loop)
+        callback = off_loop
+    if coalesce is not False:
+        interval = None if coalesce is True else float(coalesce)
+        coalescing = CoalescingCallback(callback, interval)
+        wrappers.append(coalescing)
+        callback = coalescing
+    return callback, wrappers
+
+
 async def observe_monitor(
     monitor: Callable[[Callback[T]], Monitor]
 ) -> AsyncGenerator[T, None]:
@@ -127,36 +351,76 @@ class SignalR(Signal, Generic[T]):
     """Signal that can be read from and monitored"""
 
     @abstractmethod
-    async def get_descriptor(self) -> Descriptor:
+    async def get_descriptor(
+        self, timeout: Optional[float] = DEFAULT_TIMEOUT
+    ) -> Descriptor:
         """Metadata like source, dtype, shape, precision, units"""
 
     @abstractmethod
-    async def get_reading(self, cached: Optional[bool] = None) -> Reading:
-        """The current value, timestamp and severity"""
+    async def get_reading(
+        self,
+        cached: Optional[bool] = None,
+        timeout: Optional[float] = DEFAULT_TIMEOUT,
+        max_age: Optional[float] = None,
+    ) -> Reading:
+        """The current value, timestamp and severity. If not cached, a reading
+        fetched in the last max_age seconds may be returned instead"""
+
+    @abstractmethod
+    async def get_value(
+        self,
+        cached: Optional[bool] = None,
+        timeout: Optional[float] = DEFAULT_TIMEOUT,
+        max_age: Optional[float] = None,
+    ) -> T:
+        """The current value. If not cached, a value fetched in the last
+        max_age seconds may be returned instead"""
 
     @abstractmethod
-    async def get_value(self, cached: Optional[bool] = None) -> T:
-        """The current value"""
+    def peek(self) -> Optional[Tuple[Reading, float]]:
+        """The latest monitored reading and its age in seconds, or None if not
+        monitored. Safe to call from any thread as it doesn't use the loop"""
 
     @abstractmethod
-    def monitor_reading(self, callback: Callback[Reading]) -> Monitor:
+    def monitor_reading(
+        self,
+        callback: Callback[Reading],
+        executor: Optional[Executor] = None,
+        queue_size: int = DEFAULT_QUEUE_SIZE,
+        coalesce: Union[bool, float] = False,
+    ) -> Monitor:
         """Observe changes to the current value, timestamp and severity.
 
-        First update is the current value"""
+        First update is the current value. If executor is given, callback is
+        called from it with at most queue_size updates waiting. If coalesce is
+        True, only the latest update in each event loop iteration is passed
+        on, or if it is a number, the latest update in that many seconds"""
 
     @abstractmethod
-    def monitor_value(self, callback: Callback[T]) -> Monitor:
+    def monitor_value(
+        self,
+        callback: Callback[T],
+        executor: Optional[Executor] = None,
+        queue_size: int = DEFAULT_QUEUE_SIZE,
+        coalesce: Union[bool, float] = False,
+    ) -> Monitor:
         """Observe changes to the current value.
 
-        First update is the current value"""
+        First update is the current value. If executor is given, callback is
+        called from it with at most queue_size updates waiting. If coalesce is
+        True, only the latest update in each event loop iteration is passed
+        on, or if it is a number, the latest update in that many seconds"""
 
 
 class SignalW(Signal, Generic[T]):
     """Signal that can be put to, but not read"""
 
     @abstractmethod
-    async def put(self, value: T, wait=True):
-        """Put a value to the control system."""
+    async def put(self, value: T, wait=True, timeout: Optional[float] = None):
+        """Put a value to the control system.
+
+        There is no timeout by default, as waiting for a put to complete
+        may legitimately take as long as a motor move"""
 
 
 K = TypeVar("K")
@@ -189,15 +453,60 @@ class SignalCollection:
             while self._monitors:
                 self._monitors.pop().close()
 
-    async def describe(self, name_prefix: str = "") -> Dict[str, Descriptor]:
-        return await gather_dict(
-            {name_prefix + k: sig.get_descriptor() for k, sig in self._signals.items()}
+    async def _gather_signals(
+        self, coros: Dict[str, Awaitable[V]], timeout: Optional[float]
+    ) -> Dict[str, V]:
+        # Wait for all of them so we can report every signal that timed out
+        results = await asyncio.gather(*coros.values(), return_exceptions=True)
+        late: List[str] = []
+        for result in results:
+            if isinstance(result, SignalTimeoutError):
+                late += result.sources
+        if late:
+            raise SignalTimeoutError(late, timeout)
+        for result in results:
+            if isinstance(result, BaseException):
+                raise result
+        return dict(zip(coros, cast(List[V], results)))
+
+    async def describe(
+        self, name_prefix: str = "", timeout: Optional[float] = DEFAULT_TIMEOUT
+    ) -> Dict[str, Descriptor]:
+        return await self._gather_signals(
+            {
+                name_prefix + k: sig.get_descriptor(timeout=timeout)
+                for k, sig in self._signals.items()
+            },
+            timeout,
         )
 
-    async def read(self, name_prefix: str = "") -> Dict[str, Reading]:
-        return await gather_dict(
-            {name_prefix + k: sig.get_reading() for k, sig in self._signals.items()}
+    async def read(
+        self, name_prefix: str = "", timeout: Optional[float] = DEFAULT_TIMEOUT
+    ) -> Dict[str, Reading]:
+        return await self._gather_signals(
+            {
+                name_prefix + k: sig.get_reading(timeout=timeout)
+                for k, sig in self._signals.items()
+            },
+            timeout,
+        )
+
+    async def configure(
+        self, values: Dict[str, Any], timeout: Optional[float] = DEFAULT_TIMEOUT
+    ) -> List[str]:
+        """Concurrently put values to the named signals, skipping any that already
+        have that value. Returns the names of the signals that were put to"""
+        for k in values:
+            assert k in self._signals, f"No signal {k} in {list(self._signals)}"
+            assert isinstance(self._signals[k], SignalW), f"Signal {k} not writeable"
+        current = await self._gather_signals(
+            {k: self._signals[k].get_value(timeout=timeout) for k in values}, timeout
+        )
+        changed = [k for k, v in values.items() if not np.array_equal(current[k], v)]
+        await asyncio.gather(
+            *[cast(SignalW, self._signals[k]).put(values[k]) for k in changed]
         )
+        return changed
 
     def __del__(self):
         self.set_caching(False)
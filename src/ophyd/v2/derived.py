@@ -0,0 +1,156 @@
+import asyncio
+from functools import partial
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, Type, cast
+
+import numpy as np
+from bluesky.protocols import Descriptor, Reading
+
+from .core import CompactReading, Monitor, SignalR, T
+from .epics import EpicsSignalRO
+from .pv import Pv, PvCallback
+from .pvsim import SimMonitor, primitive_dtypes
+
+
+def _as_input(value) -> Any:
+    # Let vectorised functions do arithmetic on array PVs
+    if isinstance(value, (list, tuple)):
+        return np.asarray(value)
+    return value
+
+
+def _most_severe(severities: Iterable[int]) -> int:
+    # CA readings give INVALID as -1, which is worse than MAJOR (2)
+    return max(severities, key=lambda severity: 3 if severity == -1 else severity)
+
+
+class DerivedPv(Pv[T]):
+    """A read-only Pv whose value is func(**input_values), recomputed when any
+    of the inputs changes. The inputs are monitored through their PvCaches
+    while anyone is monitoring this. The timestamp is that of the newest input,
+    and the severity that of the most severe"""
+
+    def __init__(
+        self,
+        pv: str,
+        datatype: Type[T],
+        func: Callable[..., Any],
+        inputs: Dict[str, SignalR],
+    ):
+        super().__init__(pv, datatype)
+        self.func = func
+        self.inputs = inputs
+        self._readings: Dict[str, Reading] = {}
+        self._latest: Optional[Tuple[Reading, T]] = None
+        self._listeners: List[SimMonitor[T]] = []
+        self._input_monitors: List[Monitor] = []
+        self._subscribing = False
+        #: How many times func has been called
+        self.computations = 0
+
+    @property
+    def source(self) -> str:
+        return f"derived://{self.pv}"
+
+    async def connect(self):
+        # Inputs are connected by their own devices
+        pass
+
+    async def put(self, value: T, wait=True):
+        raise NotImplementedError(f"Can't put to {self.source} as it is derived")
+
+    def _compute(self, readings: Dict[str, Reading]) -> Tuple[Reading, T]:
+        self.computations += 1
+        value = self.func(**{k: _as_input(r["value"]) for k, r in readings.items()})
+        if self.datatype in primitive_dtypes:
+            value = cast(Type, self.datatype)(value)
+        reading = CompactReading(
+            value,
+            max(r["timestamp"] for r in readings.values()),
+            _most_severe(r.get("alarm_severity", 0) for r in readings.values()),
+        )
+        return cast(Reading, reading), cast(T, value)
+
+    async def _get_latest(self) -> Tuple[Reading, T]:
+        if self._latest:
+            return self._latest
+        names = list(self.inputs)
+        readings = await asyncio.gather(*[self.inputs[k].get_reading() for k in names])
+        return self._compute(dict(zip(names, readings)))
+
+    async def get_descriptor(self) -> Descriptor:
+        value = (await self._get_latest())[1]
+        if isinstance(value, np.ndarray):
+            return dict(source=self.source, dtype="array", shape=list(value.shape))
+        if isinstance(value, np.generic):
+            value = value.item()
+        return dict(source=self.source, dtype=primitive_dtypes[type(value)], shape=[])
+
+    async def get_reading(self) -> Reading:
+        return (await self._get_latest())[0]
+
+    async def get_value(self) -> T:
+        return (await self._get_latest())[1]
+
+    def _input_changed(self, name: str, reading: Reading):
+        self._readings[name] = reading
+        # Wait until we have all the inputs before computing, and only compute
+        # once for the initial values
+        if not self._subscribing and len(self._readings) == len(self.inputs):
+            self._update()
+
+    def _update(self):
+        self._latest = self._compute(self._readings)
+        for listener in self._listeners:
+            listener.callback(*self._latest)
+
+    def _close_listener(self, monitor: SimMonitor[T]):
+        monitor.close()
+        if not self._listeners:
+            for input_monitor in self._input_monitors:
+                input_monitor.close()
+            self._input_monitors = []
+            self._readings = {}
+            self._latest = None
+
+    def monitor_reading_value(self, callback: PvCallback[T]) -> Monitor:
+        monitor = SimMonitor(callback, self._listeners)
+        if self._input_monitors:
+            if self._latest:
+                callback(*self._latest)
+        else:
+            self._subscribing = True
+            try:
+                self._input_monitors = [
+                    signal.monitor_reading(partial(self._input_changed, name))
+                    for name, signal in self.inputs.items()
+                ]
+            finally:
+                self._subscribing = False
+            if len(self._readings) == len(self.inputs):
+                self._update()
+        return _DerivedMonitor(self, monitor)
+
+
+class _DerivedMonitor:
+    def __init__(self, pv: DerivedPv, monitor: SimMonitor):
+        self._pv = pv
+        self._monitor = monitor
+
+    def close(self):
+        self._pv._close_listener(self._monitor)
+
+
+async def derived_signal(
+    name: str, func: Callable[..., Any], datatype: Type[T], **inputs: SignalR
+) -> EpicsSignalRO[T]:
+    """Make a signal called name, whose value is func(**input_values), like:
+
+        gap = await derived_signal(
+            "gap", lambda top, bottom: top - bottom, float, top=top, bottom=bottom
+        )
+
+    Array inputs are passed as numpy arrays, so func can be vectorised"""
+    pv_cls = partial(DerivedPv, func=func, inputs=inputs)
+    sig = EpicsSignalRO(cast(Type[Pv], pv_cls), datatype)
+    await sig.connect(name)
+    return sig
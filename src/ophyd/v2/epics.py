@@ -1,9 +1,12 @@
 from __future__ import annotations
 
 import asyncio
+import time
+from concurrent.futures import Executor
 from enum import Enum
 from typing import (
     Any,
+    Awaitable,
     Callable,
     Dict,
     Generic,
@@ -19,15 +22,34 @@ from typing import (
 from bluesky.protocols import Descriptor, Reading
 from typing_extensions import Protocol, get_args, get_origin
 
-from .core import Callback, CommsConnector, Monitor, SignalR, SignalW, T
+from .core import (
+    DEFAULT_QUEUE_SIZE,
+    DEFAULT_TIMEOUT,
+    Callback,
+    CommsConnector,
+    Monitor,
+    SignalR,
+    SignalW,
+    T,
+    wait_for_signal,
+    wrap_callback,
+)
+from .looplag import running_callback
 from .pv import DISCONNECTED_PV, Pv, uninstantiatable_pv
+from .pvreplay import PvReplay
 from .pvsim import PvSim
+from .tracing import get_tracer, span
 
 try:
     from .pvca import PvCa
 except ImportError:
     PvCa = uninstantiatable_pv("ca")  # type: ignore
 
+try:
+    from .pvshm import PvShm
+except ImportError:
+    PvShm = uninstantiatable_pv("shm")  # type: ignore
+
 
 class _WithPvCls:
     def __init__(self, pv_cls: Type[Pv]):
@@ -67,53 +89,180 @@ class PvCache(Generic[T]):
         self.valid = asyncio.Event()
         self.value: Optional[T] = None
         self.reading: Optional[Reading] = None
+        # (reading, time.monotonic() when it arrived), swapped as a whole on
+        # each update so other threads can read it without a lock
+        self.snapshot: Optional[Tuple[Reading, float]] = None
         self.value_listeners: List[EpicsSignalMonitor[T]] = []
         self.reading_listeners: List[EpicsSignalMonitor[Reading]] = []
 
     def _callback(self, reading: Reading, value: T):
         self.reading = reading
         self.value = value
+        self.snapshot = (reading, time.monotonic())
         self.valid.set()
-        for value_listener in self.value_listeners:
-            value_listener.callback(self.value)
-        for reading_listener in self.reading_listeners:
-            reading_listener.callback(self.reading)
-
-    async def get_value(self) -> T:
-        await self.valid.wait()
+        self._notify(self.value_listeners, value)
+        self._notify(self.reading_listeners, reading)
+
+    def _notify(self, listeners: List[EpicsSignalMonitor[M]], value: M):
+        tracer = get_tracer()
+        # Let LoopLagMonitor know who to blame if a callback blocks
+        outer_callback, outer_pv = running_callback.callback, running_callback.pv
+        running_callback.pv = self.pv
+        try:
+            for listener in listeners:
+                running_callback.callback = listener.callback
+                if tracer:
+                    with tracer.span(
+                        "monitor_callback",
+                        pv=self.pv.source,
+                        callback=listener.callback,
+                    ):
+                        listener.callback(value)
+                else:
+                    listener.callback(value)
+        finally:
+            running_callback.callback, running_callback.pv = outer_callback, outer_pv
+
+    async def _wait_valid(self, timeout: Optional[float]):
+        # Don't make a task for wait_for if we already have a value
+        if not self.valid.is_set():
+            await wait_for_signal(self.pv.source, self.valid.wait(), timeout)
+
+    async def get_value(self, timeout: Optional[float] = None) -> T:
+        await self._wait_valid(timeout)
         assert self.value is not None, "Monitor not working"
         return self.value
 
-    async def get_reading(self) -> Reading:
-        await self.valid.wait()
+    async def get_reading(self, timeout: Optional[float] = None) -> Reading:
+        await self._wait_valid(timeout)
         assert self.reading is not None, "Monitor not working"
         return self.reading
 
+    def peek(self) -> Optional[Tuple[Reading, float]]:
+        """The latest reading and how many seconds ago it arrived. Safe to call
+        from any thread"""
+        snapshot = self.snapshot
+        if snapshot is None:
+            return None
+        reading, arrived = snapshot
+        return reading, time.monotonic() - arrived
+
     def _close_surplus_monitor(self):
         if not (self.value_listeners or self.reading_listeners):
             # No-one listening
             assert self.monitor, "Why is there no monitor"
             self.monitor.close()
             self.monitor = None
+            # The value will not be updated any more
+            self.snapshot = None
 
     def _create_monitor(
         self,
         callback: Callback[M],
         listeners: List[EpicsSignalMonitor[M]],
         latest: Optional[M],
+        executor: Optional[Executor],
+        queue_size: int,
+        coalesce: Union[bool, float],
     ) -> EpicsSignalMonitor[M]:
-        m = EpicsSignalMonitor(callback, listeners, self._close_surplus_monitor)
+        callback, wrappers = wrap_callback(callback, executor, queue_size, coalesce)
+
+        def on_close():
+            for wrapper in wrappers:
+                wrapper.close()
+            self._close_surplus_monitor()
+
+        m = EpicsSignalMonitor(callback, listeners, on_close)
         if latest is not None:
             callback(latest)
         if not self.monitor:
             self.monitor = self.pv.monitor_reading_value(self._callback)
         return m
 
-    def monitor_reading(self, callback: Callback[Reading]) -> Monitor:
-        return self._create_monitor(callback, self.reading_listeners, self.reading)
-
-    def monitor_value(self, callback: Callback[T]) -> Monitor:
-        return self._create_monitor(callback, self.value_listeners, self.value)
+    def monitor_reading(
+        self,
+        callback: Callback[Reading],
+        executor: Optional[Executor] = None,
+        queue_size: int = DEFAULT_QUEUE_SIZE,
+        coalesce: Union[bool, float] = False,
+    ) -> Monitor:
+        return self._create_monitor(
+            callback,
+            self.reading_listeners,
+            self.reading,
+            executor,
+            queue_size,
+            coalesce,
+        )
+
+    def monitor_value(
+        self,
+        callback: Callback[T],
+        executor: Optional[Executor] = None,
+        queue_size: int = DEFAULT_QUEUE_SIZE,
+        coalesce: Union[bool, float] = False,
+    ) -> Monitor:
+        return self._create_monitor(
+            callback, self.value_listeners, self.value, executor, queue_size, coalesce
+        )
+
+
+class _SharedFetch:
+    """An uncached get of a PV that several callers are waiting for"""
+
+    def __init__(self, pv: Pv):
+        self.task = asyncio.create_task(pv.get_reading())
+        self.waiters = 0
+
+
+# Uncached gets in progress, and the last reading returned to a get with
+# max_age, oldest first, with the monotonic time it arrived. Keyed by
+# (source, datatype) as the datatype changes how the value is converted
+_fetching: Dict[Tuple[str, Any], _SharedFetch] = {}
+_fetched: Dict[Tuple[str, Any], Tuple[float, Reading]] = {}
+# Readings older than the largest max_age asked for are no use to anyone
+_max_age_seen = 0.0
+
+
+def _store_fetched(key: Tuple[str, Any], reading: Reading, max_age: float):
+    global _max_age_seen
+    _max_age_seen = max(_max_age_seen, max_age)
+    now = time.monotonic()
+    # Reinsert so the dict stays in arrival order, then evict from the front
+    _fetched.pop(key, None)
+    _fetched[key] = (now, reading)
+    for old_key, (fetched_at, _) in list(_fetched.items()):
+        if now - fetched_at <= _max_age_seen:
+            break
+        del _fetched[old_key]
+
+
+async def read_through(pv: Pv, max_age: Optional[float] = None) -> Reading:
+    """Get a reading from pv without a monitor. A reading fetched for a get with
+    max_age in the last max_age seconds is returned if there is one, and
+    concurrent callers share a single request to the PV"""
+    key = (pv.source, pv.datatype)
+    if max_age is not None and key in _fetched:
+        fetched_at, reading = _fetched[key]
+        if time.monotonic() - fetched_at <= max_age:
+            return reading
+    fetch = _fetching.get(key)
+    if fetch is None:
+        fetch = _fetching[key] = _SharedFetch(pv)
+    fetch.waiters += 1
+    try:
+        # Shield so one caller timing out doesn't cancel it for the others
+        reading = await asyncio.shield(fetch.task)
+    finally:
+        fetch.waiters -= 1
+        if _fetching.get(key) is fetch and (fetch.task.done() or not fetch.waiters):
+            del _fetching[key]
+            if not fetch.task.done():
+                # Everyone gave up waiting
+                fetch.task.cancel()
+    if max_age is not None:
+        _store_fetched(key, reading, max_age)
+    return reading
 
 
 class _EpicsSignalR(SignalR[T], _WithDatatype[T]):
@@ -124,8 +273,13 @@ class _EpicsSignalR(SignalR[T], _WithDatatype[T]):
     def source(self) -> str:
         return self.read_pv.source
 
-    async def get_descriptor(self) -> Descriptor:
-        return await self.read_pv.get_descriptor()
+    async def get_descriptor(
+        self, timeout: Optional[float] = DEFAULT_TIMEOUT
+    ) -> Descriptor:
+        with span("get_descriptor", pv=self.source):
+            return await wait_for_signal(
+                self.source, self.read_pv.get_descriptor(), timeout
+            )
 
     def _get_pv(self, cached: Optional[bool]) -> Union[Pv[T], PvCache[T]]:
         # If we don't specify caching, choose it if there is a cache
@@ -139,33 +293,132 @@ class _EpicsSignalR(SignalR[T], _WithDatatype[T]):
         else:
             return self.read_pv
 
-    async def get_reading(self, cached: Optional[bool] = None) -> Reading:
-        return await self._get_pv(cached).get_reading()
-
-    async def get_value(self, cached: Optional[bool] = None) -> T:
-        return await self._get_pv(cached).get_value()
+    async def get_reading(
+        self,
+        cached: Optional[bool] = None,
+        timeout: Optional[float] = DEFAULT_TIMEOUT,
+        max_age: Optional[float] = None,
+    ) -> Reading:
+        pv = self._get_pv(cached)
+        with span("get_reading", pv=self.source, cached=isinstance(pv, PvCache)):
+            if isinstance(pv, PvCache):
+                return await pv.get_reading(timeout)
+            return await wait_for_signal(
+                self.source, read_through(pv, max_age), timeout
+            )
+
+    async def get_value(
+        self,
+        cached: Optional[bool] = None,
+        timeout: Optional[float] = DEFAULT_TIMEOUT,
+        max_age: Optional[float] = None,
+    ) -> T:
+        pv = self._get_pv(cached)
+        with span("get_value", pv=self.source, cached=isinstance(pv, PvCache)):
+            if isinstance(pv, PvCache):
+                return await pv.get_value(timeout)
+            reading = await wait_for_signal(
+                self.source, read_through(pv, max_age), timeout
+            )
+            return reading["value"]
+
+    def peek(self) -> Optional[Tuple[Reading, float]]:
+        cache = self._cache
+        return cache.peek() if cache else None
 
     def _get_cache(self) -> PvCache:
         if self._cache is None:
             self._cache = PvCache(self.read_pv)
         return self._cache
 
-    def monitor_reading(self, callback: Callback[Reading]) -> Monitor:
-        return self._get_cache().monitor_reading(callback)
+    def monitor_reading(
+        self,
+        callback: Callback[Reading],
+        executor: Optional[Executor] = None,
+        queue_size: int = DEFAULT_QUEUE_SIZE,
+        coalesce: Union[bool, float] = False,
+    ) -> Monitor:
+        return self._get_cache().monitor_reading(
+            callback, executor, queue_size, coalesce
+        )
+
+    def monitor_value(
+        self,
+        callback: Callback[T],
+        executor: Optional[Executor] = None,
+        queue_size: int = DEFAULT_QUEUE_SIZE,
+        coalesce: Union[bool, float] = False,
+    ) -> Monitor:
+        return self._get_cache().monitor_value(callback, executor, queue_size, coalesce)
 
-    def monitor_value(self, callback: Callback[T]) -> Monitor:
-        return self._get_cache().monitor_value(callback)
+
+class PutCoalescer(Generic[T]):
+    """Keep at most one put in flight and one pending, with newer values replacing
+    the pending one. Each caller that waits is released when a put of its value,
+    or a value that replaced it, completes"""
+
+    def __init__(self, put: Callable[[T], Awaitable[None]]):
+        self._put = put
+        self._task: Optional[asyncio.Task] = None
+        self._has_pending = False
+        self._pending_value: Any = None
+        self._pending_waiters: List[asyncio.Future] = []
+
+    async def put(self, value: T, wait=True):
+        self._has_pending = True
+        self._pending_value = value
+        if wait:
+            waiter = asyncio.get_running_loop().create_future()
+            self._pending_waiters.append(waiter)
+        if self._task is None:
+            self._task = asyncio.create_task(self._put_pending())
+        if wait:
+            await waiter
+
+    async def _put_pending(self):
+        while self._has_pending:
+            value, waiters = self._pending_value, self._pending_waiters
+            self._has_pending, self._pending_waiters = False, []
+            try:
+                await self._put(value)
+            except Exception as e:
+                for waiter in waiters:
+                    if not waiter.done():
+                        waiter.set_exception(e)
+            else:
+                for waiter in waiters:
+                    if not waiter.done():
+                        waiter.set_result(None)
+        self._task = None
 
 
 class _EpicsSignalW(SignalW[T], _WithDatatype[T]):
     write_pv: Pv[T] = DISCONNECTED_PV
+    _put_coalescer: Optional[PutCoalescer[T]] = None
 
     @property
     def source(self) -> str:
         return self.write_pv.source
 
-    async def put(self, value: T, wait=True):
-        await self.write_pv.put(value, wait=wait)
+    def set_put_coalescing(self, coalescing: bool):
+        """If coalescing, puts that arrive while one is in flight are merged so
+        only the latest value is put next"""
+        if coalescing:
+            self._put_coalescer = PutCoalescer(self._put_and_wait)
+        else:
+            self._put_coalescer = None
+
+    async def _put_and_wait(self, value: T):
+        await self.write_pv.put(value, wait=True)
+
+    async def put(self, value: T, wait=True, timeout: Optional[float] = None):
+        source = self.source
+        if self._put_coalescer:
+            coro = self._put_coalescer.put(value, wait=wait)
+        else:
+            coro = self.write_pv.put(value, wait=wait)
+        with span("put", pv=source, value=value, wait=wait):
+            await wait_for_signal(source, coro, timeout)
 
 
 def assert_pv_matches(pv_inst: Pv, pv_str: str):
@@ -179,14 +432,16 @@ class EpicsSignalRO(_EpicsSignalR[T]):
     async def connect(self, read_pv: str):
         assert_pv_matches(self.read_pv, read_pv)
         self.read_pv = self._pv_cls(read_pv, self._datatype)
-        await self.read_pv.connect()
+        with span("connect", pv=self.read_pv.source):
+            await self.read_pv.connect()
 
 
 class EpicsSignalWO(_EpicsSignalW[T]):
     async def connect(self, write_pv: str):
         assert_pv_matches(self.write_pv, write_pv)
         self.write_pv = self._pv_cls(write_pv, self._datatype)
-        await self.write_pv.connect()
+        with span("connect", pv=self.write_pv.source):
+            await self.write_pv.connect()
 
 
 class EpicsSignalRW(_EpicsSignalR[T], _EpicsSignalW[T]):
@@ -198,7 +453,8 @@ class EpicsSignalRW(_EpicsSignalR[T], _EpicsSignalW[T]):
             self.read_pv = self._pv_cls(read_pv, self._datatype)
         else:
             self.read_pv = self.write_pv
-        await asyncio.gather(self.write_pv.connect(), self.read_pv.connect())
+        with span("connect", pv=self.write_pv.source, read_pv=self.read_pv.source):
+            await asyncio.gather(self.write_pv.connect(), self.read_pv.connect())
 
 
 class EpicsSignalX(_WithPvCls):
@@ -215,15 +471,19 @@ class EpicsSignalX(_WithPvCls):
         self.write_pv = self._pv_cls(write_pv, type(self.write_value))
         self.write_value = write_value
         self.wait = wait
-        await self.write_pv.connect()
+        with span("connect", pv=self.write_pv.source):
+            await self.write_pv.connect()
 
     async def execute(self) -> None:
-        await self.write_pv.put(self.write_value, wait=self.wait)
+        with span("put", pv=self.write_pv.source, value=self.write_value):
+            await self.write_pv.put(self.write_value, wait=self.wait)
 
 
 class PvMode(Enum):
     ca = PvCa
     pva = PvCa  # TODO change to PvPva when Alan's written it
+    shm = PvShm
+    replay = PvReplay
 
 
 _default_pv_mode = PvMode.ca
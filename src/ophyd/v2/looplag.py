@@ -0,0 +1,129 @@
+import asyncio
+import inspect
+import logging
+import sys
+import threading
+import time
+from dataclasses import dataclass
+from types import FrameType
+from typing import Any, List, Optional
+
+from .tracing import describe_callback
+
+
+class RunningCallback:
+    """The monitor callback that the event loop is currently running.
+
+    PvCache and PvSim set this around each listener call so that stalls can be
+    attributed to them. It is just two attribute stores, so is cheap enough to
+    leave on all the time"""
+
+    __slots__ = ("callback", "pv")
+
+    def __init__(self):
+        self.callback: Any = None
+        self.pv: Any = None
+
+
+running_callback = RunningCallback()
+
+
+def _describe_frame(frame: FrameType) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({code.co_filename}:{frame.f_lineno})"
+
+
+def _innermost_coroutine(frame: Optional[FrameType]) -> Optional[FrameType]:
+    while frame is not None:
+        if frame.f_code.co_flags & inspect.CO_COROUTINE:
+            return frame
+        frame = frame.f_back
+    return None
+
+
+@dataclass
+class Stall:
+    #: How long the loop had been blocked when the stall was reported
+    lag: float
+    #: The monitor callback being run, or the coroutine if no callback
+    culprit: str
+    #: The PV whose monitor callback was running, if any
+    source: Optional[str]
+    #: Where the loop thread was executing when the stall was reported
+    location: str
+
+
+class LoopLagMonitor:
+    """Continuously measure how late the event loop runs a scheduled callback.
+
+    A watchdog thread reports a Stall if the loop doesn't run for threshold
+    seconds, naming the monitor callback or coroutine that is blocking it"""
+
+    def __init__(self, threshold: float = 0.1, interval: float = 0.02):
+        self.threshold = threshold
+        self.interval = interval
+        self.max_lag = 0.0
+        self.stalls: List[Stall] = []
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread_id = 0
+        self._expected = 0.0
+        self._handle: Optional[asyncio.TimerHandle] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stopping = threading.Event()
+
+    def start(self):
+        """Start monitoring the running event loop"""
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._stopping.clear()
+        self._schedule_beat()
+        self._watchdog = threading.Thread(
+            target=self._watch, name="LoopLagMonitor", daemon=True
+        )
+        self._watchdog.start()
+
+    def stop(self):
+        if self._handle:
+            self._handle.cancel()
+            self._handle = None
+        self._stopping.set()
+        if self._watchdog:
+            self._watchdog.join()
+            self._watchdog = None
+
+    def _schedule_beat(self):
+        assert self._loop, "Not started"
+        self._expected = time.monotonic() + self.interval
+        self._handle = self._loop.call_later(self.interval, self._beat)
+
+    def _beat(self):
+        self.max_lag = max(self.max_lag, time.monotonic() - self._expected)
+        self._schedule_beat()
+
+    def _watch(self):
+        reported_for = None
+        while not self._stopping.wait(self.interval / 2):
+            expected = self._expected
+            lag = time.monotonic() - expected
+            if lag > self.threshold and reported_for != expected:
+                # Only report each stall once
+                reported_for = expected
+                self._report(lag)
+
+    def _report(self, lag: float):
+        frame = sys._current_frames().get(self._loop_thread_id)
+        location = _describe_frame(frame) if frame else "unknown"
+        callback, pv = running_callback.callback, running_callback.pv
+        if callback is not None:
+            culprit = describe_callback(callback)
+            source = pv.source if pv is not None else None
+        else:
+            coroutine = _innermost_coroutine(frame)
+            culprit = _describe_frame(coroutine) if coroutine else location
+            source = None
+        stall = Stall(lag, culprit, source, location)
+        self.stalls.append(stall)
+        logging.warning(
+            f"Event loop blocked for {lag:.3f}s by {culprit}"
+            + (f" monitoring {source}" if source else "")
+        )
@@ -1,13 +1,23 @@
-from typing import Any, List
+from typing import Any, Dict, List
 
 from bluesky import RunEngine
 from bluesky import plan_stubs as bps
+from bluesky.protocols import Readable
 from IPython.core.magic import Magics, line_magic, magics_class
 
+from .batch import get_values
+from .core import Device
 
-def print_rd(obj):
-    value = yield from bps.rd(obj)
-    print(value)
+
+def format_table(values: Dict[str, Any]) -> str:
+    """Align values in a column after their names, showing errors by type"""
+    width = max((len(name) for name in values), default=0)
+    lines = []
+    for name, value in values.items():
+        if isinstance(value, Exception):
+            value = f"{type(value).__name__}: {value}"
+        lines.append(f"{name:<{width}}  {value}")
+    return "\n".join(lines)
 
 
 @magics_class
@@ -25,10 +35,22 @@ class OphydMagics(Magics):
         return self.shell.user_ns["RE"]
 
     def eval(self, arg: str) -> Any:
+        # Most args are just device names, so don't compile them
+        if arg.isidentifier() and arg in self.shell.user_ns:
+            return self.shell.user_ns[arg]
         return eval(arg, self.shell.user_ns)
 
     def eval_args(self, line: str) -> List:
-        return [eval(arg, self.shell.user_ns) for arg in line.split()]
+        return [self.eval(arg) for arg in line.split()]
+
+    def named_devices(self) -> Dict[str, Device]:
+        return {
+            name: obj
+            for name, obj in sorted(self.shell.user_ns.items())
+            if not name.startswith("_")
+            and isinstance(obj, Device)
+            and isinstance(obj, Readable)
+        }
 
     @line_magic
     def mov(self, line: str):
@@ -40,4 +62,23 @@ class OphydMagics(Magics):
 
     @line_magic
     def rd(self, line: str):
-        self.RE(print_rd(self.eval(line)))
+        """Concurrently read the given devices, printing a table if several"""
+        args = line.split()
+        values = get_values({arg: self.eval(arg) for arg in args})
+        if len(values) == 1:
+            value = values[args[0]]
+            if isinstance(value, Exception):
+                raise value
+            print(value)
+        else:
+            print(format_table(values))
+
+    @line_magic
+    def wa(self, line: str):
+        """Concurrently read every named device, or those given, as a table.
+        Cached values are used for monitored signals and staged devices"""
+        if line.strip():
+            devices = {arg: self.eval(arg) for arg in line.split()}
+        else:
+            devices = self.named_devices()
+        print(format_table(get_values(devices)))
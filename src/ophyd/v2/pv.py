@@ -1,5 +1,6 @@
+import asyncio
 from abc import ABC, abstractmethod
-from typing import Callable, Generic, Type
+from typing import Callable, Generic, List, Sequence, Type
 
 from bluesky.protocols import Descriptor, Reading
 
@@ -8,6 +9,17 @@ from .core import Monitor, T
 PvCallback = Callable[[Reading, T], None]
 
 
+class TaskMonitor:
+    """Monitor that is a background task polling or replaying values, closed by
+    cancelling it"""
+
+    def __init__(self, task: asyncio.Task):
+        self._task = task
+
+    def close(self):
+        self._task.cancel()
+
+
 class Pv(ABC, Generic[T]):
     def __init__(self, pv: str, datatype: Type[T]):
         self.pv = pv
@@ -42,6 +54,13 @@ class Pv(ABC, Generic[T]):
     def monitor_reading_value(self, callback: PvCallback[T]) -> Monitor:
         """Observe changes to the current value, timestamp and severity."""
 
+    @classmethod
+    async def get_readings(cls, pvs: Sequence["Pv"]) -> List[Reading]:
+        """The current readings of many PVs of this class.
+
+        Transports that can batch requests should override this"""
+        return list(await asyncio.gather(*[pv.get_reading() for pv in pvs]))
+
 
 DISCONNECTED_ERROR = NotImplementedError(
     "No PV has been set as EpicsSignal.connect has not been called"
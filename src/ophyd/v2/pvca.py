@@ -1,12 +1,13 @@
+import asyncio
 from enum import Enum
-from typing import Any, Dict, Sequence, Tuple, Type
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Type, cast
 
 from aioca import FORMAT_CTRL, FORMAT_TIME, caget, camonitor, caput, connect
 from aioca.types import AugmentedValue, Dbr
 from bluesky.protocols import Descriptor, Dtype, Reading
 from epicscorelibs.ca import dbr
 
-from .core import Monitor, T
+from .core import CompactReading, Monitor, T
 from .pv import Pv, PvCallback
 
 dbr_to_dtype: Dict[Dbr, Dtype] = {
@@ -34,6 +35,9 @@ class CaValueConverter:
     def from_ca(self, value):
         ...
 
+    def descriptor(self, source: str, value: AugmentedValue) -> Descriptor:
+        return make_ca_descriptor(source, value)
+
 
 class NullConverter(CaValueConverter):
     def to_ca(self, value):
@@ -44,20 +48,35 @@ class NullConverter(CaValueConverter):
 
 
 class EnumConverter(CaValueConverter):
+    """Transfers enums as DBR_ENUM indices, using lookup tables made from the
+    enum strings at connect time"""
+
     def __init__(self, enum_cls: Type[Enum]) -> None:
         self.enum_cls = enum_cls
+        # Enum member for each index, or None if the string is not in enum_cls
+        self.choices: Tuple[Optional[Enum], ...] = ()
+        self.indices: Dict[Enum, int] = {}
 
     async def validate(self, pv: str):
         value = await caget(pv, format=FORMAT_CTRL)
         assert hasattr(value, "enums"), f"{pv} is not an enum"
         unrecognized = set(v.value for v in self.enum_cls) - set(value.enums)
         assert not unrecognized, f"Enum strings {unrecognized} not in {value.enums}"
+        members = {v.value: v for v in self.enum_cls}
+        self.choices = tuple(members.get(s) for s in value.enums)
+        self.indices = {v: i for i, v in enumerate(self.choices) if v is not None}
 
     def to_ca(self, value: Enum):
-        return value.value
+        return self.indices[value]
 
     def from_ca(self, value: AugmentedValue):
-        return self.enum_cls(value)
+        member = self.choices[value]
+        if member is None:
+            raise ValueError(f"Index {value} is not a valid {self.enum_cls.__name__}")
+        return member
+
+    def descriptor(self, source: str, value: AugmentedValue) -> Descriptor:
+        return dict(source=source, dtype="string", shape=[])
 
 
 def make_ca_descriptor(source: str, value: AugmentedValue) -> Descriptor:
@@ -77,14 +96,12 @@ def make_ca_reading(
     value: AugmentedValue, converter: CaValueConverter
 ) -> Tuple[Reading, Any]:
     conv_value = converter.from_ca(value)
-    return (
-        dict(
-            value=conv_value,
-            timestamp=value.timestamp,
-            alarm_severity=-1 if value.severity > 2 else value.severity,
-        ),
+    reading = CompactReading(
         conv_value,
+        value.timestamp,
+        -1 if value.severity > 2 else value.severity,
     )
+    return cast(Reading, reading), conv_value
 
 
 class PvCa(Pv[T]):
@@ -93,10 +110,11 @@ class PvCa(Pv[T]):
     def __init__(self, pv: str, datatype: Type[T]):
         super().__init__(pv, datatype)
         self.converter = NullConverter()
-        self.ca_datatype: type = datatype
+        # An object datatype means use whatever the PV's native type is
+        self.ca_datatype: Any = None if datatype is object else datatype
         if issubclass(datatype, Enum):
             self.converter = EnumConverter(datatype)
-            self.ca_datatype = str
+            self.ca_datatype = dbr.DBR_ENUM
 
     @property
     def source(self) -> str:
@@ -111,7 +129,7 @@ class PvCa(Pv[T]):
 
     async def get_descriptor(self) -> Descriptor:
         value = await caget(self.pv, datatype=self.ca_datatype, format=FORMAT_CTRL)
-        return make_ca_descriptor(self.source, value)
+        return self.converter.descriptor(self.source, value)
 
     async def get_reading(self) -> Reading:
         value = await caget(self.pv, datatype=self.ca_datatype, format=FORMAT_TIME)
@@ -128,3 +146,27 @@ class PvCa(Pv[T]):
             datatype=self.ca_datatype,
             format=FORMAT_TIME,
         )
+
+    @classmethod
+    async def get_readings(cls, pvs: Sequence[Pv]) -> List[Reading]:
+        # caget fetches a list of PVs as one batch if they share a datatype
+        groups: Dict[Any, List[PvCa]] = {}
+        for pv in pvs:
+            assert isinstance(pv, PvCa), f"{pv} is not a PvCa"
+            groups.setdefault(pv.ca_datatype, []).append(pv)
+
+        async def get_group(group: List[PvCa]) -> Dict[Pv, Reading]:
+            values = await caget(
+                [pv.pv for pv in group],
+                datatype=group[0].ca_datatype,
+                format=FORMAT_TIME,
+            )
+            return {
+                pv: make_ca_reading(value, pv.converter)[0]
+                for pv, value in zip(group, values)
+            }
+
+        readings: Dict[Pv, Reading] = {}
+        for group_readings in await asyncio.gather(*map(get_group, groups.values())):
+            readings.update(group_readings)
+        return [readings[pv] for pv in pvs]
@@ -0,0 +1,233 @@
+import asyncio
+import json
+import re
+import time
+from pathlib import Path
+from typing import IO, Any, Dict, List, Optional, Tuple, Type, Union, cast
+
+import numpy as np
+from bluesky.protocols import Descriptor, Reading
+
+from .core import CompactReading, Monitor, T
+from .pv import Pv, PvCallback, TaskMonitor
+from .pvsim import primitive_dtypes
+
+INDEX = "index.json"
+
+
+def _file_stem(pv: str) -> str:
+    return re.sub(r"[^A-Za-z0-9_.-]", "_", pv)
+
+
+class _Columns:
+    # Append only column files for the updates of one PV
+    def __init__(self, directory: Path, pv: str, value: np.ndarray):
+        assert value.dtype.kind in "biuf", f"Can't record {value.dtype} from {pv}"
+        self.pv = pv
+        self.dtype, self.shape = value.dtype, value.shape
+        self.stem = _file_stem(pv)
+        self.meta = dict(stem=self.stem, dtype=value.dtype.str, shape=value.shape)
+        self.files: List[IO[bytes]] = [
+            open(directory / f"{self.stem}.{column}", "ab")
+            for column in ("timestamps", "values", "severities")
+        ]
+
+    def append(self, reading: Reading, value: np.ndarray):
+        # Every update must be the same size, or the columns would misalign
+        assert (value.dtype, value.shape) == (self.dtype, self.shape), (
+            f"{self.pv} changed from {self.dtype}{list(self.shape)} to "
+            f"{value.dtype}{list(value.shape)}, which can't be recorded"
+        )
+        timestamps, values, severities = self.files
+        timestamps.write(np.float64(reading["timestamp"]).tobytes())
+        values.write(value.tobytes())
+        severities.write(np.int8(reading.get("alarm_severity", 0)).tobytes())
+
+    def close(self):
+        for f in self.files:
+            f.close()
+
+
+class MonitorRecorder:
+    """Record the monitor updates of Pvs into a directory with timestamp,
+    value and severity column files for each PV, for PvReplay to replay.
+
+    Only numeric scalars and fixed length arrays can be recorded, so an update
+    that changes the dtype or shape is refused with an AssertionError"""
+
+    def __init__(self, directory: Union[str, Path]):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._columns: Dict[str, _Columns] = {}
+        self._monitors: List[Monitor] = []
+
+    def record(self, pv: Pv):
+        """Record monitor updates from pv until close() is called"""
+
+        def callback(reading: Reading, value):
+            array = np.asarray(value)
+            columns = self._columns.get(pv.pv)
+            if columns is None:
+                columns = self._columns[pv.pv] = _Columns(self.directory, pv.pv, array)
+                self._write_index()
+            columns.append(reading, array)
+
+        self._monitors.append(pv.monitor_reading_value(callback))
+
+    def _write_index(self):
+        index = {pv: columns.meta for pv, columns in self._columns.items()}
+        (self.directory / INDEX).write_text(json.dumps(index))
+
+    def close(self):
+        for monitor in self._monitors:
+            monitor.close()
+        for columns in self._columns.values():
+            columns.close()
+        self._monitors, self._columns = [], {}
+
+
+class Recording:
+    """Memory mapped columns of a directory written by MonitorRecorder"""
+
+    def __init__(self, directory: Union[str, Path]):
+        self.directory = Path(directory)
+        self.index: Dict[str, Dict[str, Any]] = json.loads(
+            (self.directory / INDEX).read_text()
+        )
+        self._columns: Dict[str, Tuple[np.ndarray, np.ndarray, np.ndarray]] = {}
+
+    def columns(self, pv: str) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """The timestamps, values and severities recorded for pv"""
+        if pv not in self._columns:
+            assert pv in self.index, f"{pv} not in recording {self.directory}"
+            meta = self.index[pv]
+            shape = tuple(meta["shape"])
+            dtypes = dict(
+                timestamps=np.dtype(np.float64),
+                values=np.dtype((meta["dtype"], shape)),
+                severities=np.dtype(np.int8),
+            )
+            paths = {k: self.directory / f"{meta['stem']}.{k}" for k in dtypes}
+            # Only use complete updates, in case the recorder was interrupted
+            length = min(
+                paths[k].stat().st_size // dt.itemsize for k, dt in dtypes.items()
+            )
+            self._columns[pv] = cast(
+                Tuple[np.ndarray, np.ndarray, np.ndarray],
+                tuple(
+                    (
+                        np.memmap(paths[k], dt, "r", shape=(length,))
+                        if length
+                        else np.empty((0,), dt)
+                    )
+                    for k, dt in dtypes.items()
+                ),
+            )
+        return self._columns[pv]
+
+
+class Replay:
+    """A recording being replayed, speed times faster than it was recorded,
+    starting when this is created"""
+
+    def __init__(self, recording: Recording, speed: float = 1.0):
+        self.recording = recording
+        self.speed = speed
+        self.start_time = time.time()
+        self.start_monotonic = time.monotonic()
+        firsts = [recording.columns(pv)[0][:1] for pv in recording.index]
+        self.first_timestamp = min((ts[0] for ts in firsts if len(ts)), default=0.0)
+
+    def recorded_now(self) -> float:
+        """The recorded timestamp we have replayed up to"""
+        elapsed = time.monotonic() - self.start_monotonic
+        return self.first_timestamp + elapsed * self.speed
+
+    def replayed_timestamp(self, timestamp: float) -> float:
+        """The time a recorded timestamp is replayed at"""
+        return self.start_time + (timestamp - self.first_timestamp) / self.speed
+
+    def wait_time(self, timestamp: float) -> float:
+        """How long until a recorded timestamp is replayed"""
+        return (timestamp - self.recorded_now()) / self.speed
+
+
+_replay: Optional[Replay] = None
+
+
+def set_replay(directory: Union[str, Path], speed: float = 1.0) -> Replay:
+    """Start replaying a recording made by MonitorRecorder to replay:// PVs"""
+    global _replay
+    _replay = Replay(Recording(directory), speed)
+    return _replay
+
+
+class PvReplay(Pv[T]):
+    """Read-only PV that replays a recorded monitor stream with its original
+    timing, or faster, as set by set_replay(). Timestamps are shifted to when
+    they are replayed"""
+
+    replay: Replay
+
+    @property
+    def source(self) -> str:
+        return f"replay://{self.pv}"
+
+    async def connect(self):
+        assert _replay, "set_replay() not called"
+        self.replay = _replay
+        self._timestamps, self._values, self._severities = _replay.recording.columns(
+            self.pv
+        )
+        assert len(self._timestamps), f"No updates recorded for {self.pv}"
+
+    async def put(self, value: T, wait=True):
+        raise NotImplementedError(f"Can't put to {self.source} as it is read only")
+
+    def _index_now(self) -> int:
+        # The latest update replayed so far, or the first if none yet
+        now = self.replay.recorded_now()
+        return max(int(np.searchsorted(self._timestamps, now, side="right")) - 1, 0)
+
+    def _update(self, i: int) -> Tuple[Reading, T]:
+        value = self._values[i]
+        if not value.shape:
+            value = self._scalar(value)
+        reading = CompactReading(
+            value,
+            self.replay.replayed_timestamp(float(self._timestamps[i])),
+            int(self._severities[i]),
+        )
+        return cast(Reading, reading), cast(T, value)
+
+    def _scalar(self, value: np.generic) -> Any:
+        # Convert to a Python scalar of the requested type
+        scalar = value.item()
+        if self.datatype in primitive_dtypes:
+            scalar = cast(Type, self.datatype)(scalar)
+        return scalar
+
+    async def get_descriptor(self) -> Descriptor:
+        value = self._values[0]
+        if value.shape:
+            return dict(source=self.source, dtype="array", shape=list(value.shape))
+        dtype = primitive_dtypes[type(self._scalar(value))]
+        return dict(source=self.source, dtype=dtype, shape=[])
+
+    async def get_reading(self) -> Reading:
+        return self._update(self._index_now())[0]
+
+    async def get_value(self) -> T:
+        return self._update(self._index_now())[1]
+
+    async def _play(self, callback: PvCallback[T], i: int):
+        for i in range(i + 1, len(self._timestamps)):
+            wait = self.replay.wait_time(float(self._timestamps[i]))
+            if wait > 0:
+                await asyncio.sleep(wait)
+            callback(*self._update(i))
+
+    def monitor_reading_value(self, callback: PvCallback[T]) -> Monitor:
+        i = self._index_now()
+        callback(*self._update(i))
+        return TaskMonitor(asyncio.create_task(self._play(callback, i)))
@@ -0,0 +1,238 @@
+import asyncio
+import re
+from multiprocessing import resource_tracker, shared_memory
+from typing import Optional, Set, Tuple, cast
+
+import numpy as np
+from bluesky.protocols import Descriptor, Reading
+
+from .core import CompactReading, Monitor, SignalR, T
+from .pv import Pv, PvCallback, TaskMonitor
+
+# Header is [version, write_seq, slots, max_elements] then the dtype string
+_VERSION = 1
+_HEADER_SIZE = 64
+_DTYPE_OFFSET = 32
+_SLOT_DTYPE = np.dtype(
+    [("seq", "i8"), ("timestamp", "f8"), ("severity", "i8"), ("length", "i8")]
+)
+
+
+# Segments created by this process, which the resource tracker should unlink
+_created: Set[str] = set()
+
+
+def shm_name(pv: str) -> str:
+    """The shared memory segment name for a PV"""
+    return "ophyd_" + re.sub(r"[^A-Za-z0-9_.-]", "_", pv)
+
+
+class ShmRing:
+    """A ring of array updates with sequence numbers in shared memory.
+
+    There is one writer, and any number of readers in other processes. The
+    writer marks a slot as being written by setting its seq to -1, so readers
+    can tell if a slot was overwritten while they were reading it"""
+
+    def __init__(self, shm: shared_memory.SharedMemory):
+        self.shm = shm
+        buf = shm.buf
+        assert buf is not None, f"{shm.name} is closed"
+        self._header = np.ndarray((4,), np.int64, buf)
+        version, _, slots, max_elements = self._header
+        assert version == _VERSION, f"{shm.name} is not an ophyd ShmRing"
+        dtype_bytes = bytes(buf[_DTYPE_OFFSET:_HEADER_SIZE]).rstrip(b"\0")
+        self.dtype = np.dtype(dtype_bytes.decode())
+        self.slots = int(slots)
+        self.max_elements = int(max_elements)
+        self._meta = np.ndarray((self.slots,), _SLOT_DTYPE, buf, _HEADER_SIZE)
+        data_offset = _HEADER_SIZE + self.slots * _SLOT_DTYPE.itemsize
+        self._data = np.ndarray(
+            (self.slots, self.max_elements), self.dtype, buf, data_offset
+        )
+
+    @classmethod
+    def create(cls, name: str, dtype, max_elements: int, slots: int = 8) -> "ShmRing":
+        dtype = np.dtype(dtype)
+        size = (
+            _HEADER_SIZE
+            + slots * _SLOT_DTYPE.itemsize
+            + slots * max_elements * dtype.itemsize
+        )
+        shm = shared_memory.SharedMemory(name, create=True, size=size)
+        _created.add(shm.name)
+        buf = cast(memoryview, shm.buf)
+        np.ndarray((4,), np.int64, buf)[:] = [_VERSION, 0, slots, max_elements]
+        dtype_str = dtype.str.encode()
+        buf[_DTYPE_OFFSET : _DTYPE_OFFSET + len(dtype_str)] = dtype_str
+        return cls(shm)
+
+    @classmethod
+    def attach(cls, name: str) -> "ShmRing":
+        shm = shared_memory.SharedMemory(name)
+        if shm.name not in _created:
+            # Python < 3.13 tracks attached segments as if we created them, and
+            # would unlink them from under the writer when we exit
+            resource_tracker.unregister(shm._name, "shared_memory")  # type: ignore
+        return cls(shm)
+
+    @property
+    def write_seq(self) -> int:
+        """Sequence number of the latest update, 0 if none"""
+        return int(self._header[1])
+
+    def write(self, value: np.ndarray, timestamp: float, severity: int = 0):
+        seq = self.write_seq + 1
+        length = len(value)
+        assert (
+            length <= self.max_elements
+        ), f"{length} elements won't fit in {self.max_elements} element ring"
+        meta = self._meta[seq % self.slots]
+        meta["seq"] = -1
+        self._data[seq % self.slots, :length] = value
+        meta["timestamp"] = timestamp
+        meta["severity"] = severity
+        meta["length"] = length
+        meta["seq"] = seq
+        self._header[1] = seq
+
+    def read(self, seq: int) -> Optional[Tuple[np.ndarray, float, int]]:
+        """A copy of update seq with its timestamp and severity, or None if it
+        has been overwritten"""
+        meta = self._meta[seq % self.slots]
+        if meta["seq"] != seq:
+            return None
+        timestamp, severity, length = (
+            float(meta["timestamp"]),
+            int(meta["severity"]),
+            int(meta["length"]),
+        )
+        value = self._data[seq % self.slots, :length].copy()
+        # Check the writer didn't start on the slot while we were copying it
+        if meta["seq"] != seq:
+            return None
+        return value, timestamp, severity
+
+    def close(self):
+        # Views must be gone before the memory can be closed
+        del self._header, self._meta, self._data
+        self.shm.close()
+
+    def unlink(self):
+        """Close and remove the segment, which only its creator should do"""
+        self.close()
+        self.shm.unlink()
+        _created.discard(self.shm.name)
+
+
+class ShmPublisher:
+    """Publish the monitored array values of signal into a ShmRing, so that
+    PvShm in other processes can share its single monitor"""
+
+    def __init__(
+        self,
+        signal: SignalR,
+        max_elements: int,
+        dtype=np.float64,
+        slots: int = 8,
+    ):
+        self.signal = signal
+        self.max_elements = max_elements
+        self.dtype = dtype
+        self.slots = slots
+        self.ring: Optional[ShmRing] = None
+        self._monitor: Optional[Monitor] = None
+
+    def start(self):
+        pv = self.signal.source.split("://", 1)[-1]
+        self.ring = ShmRing.create(
+            shm_name(pv), self.dtype, self.max_elements, self.slots
+        )
+        self._monitor = self.signal.monitor_reading(self._publish)
+
+    def _publish(self, reading: Reading):
+        assert self.ring, "Not started"
+        self.ring.write(
+            np.asarray(reading["value"]),
+            reading["timestamp"],
+            reading.get("alarm_severity", 0),
+        )
+
+    def close(self):
+        if self._monitor:
+            self._monitor.close()
+            self._monitor = None
+        if self.ring:
+            self.ring.unlink()
+            self.ring = None
+
+
+class PvShm(Pv[T]):
+    """Read-only access to arrays published by a ShmPublisher in this or another
+    process. Values are copied out of shared memory, so stay valid in caches
+    after the ring wraps around"""
+
+    #: How often to check for new updates
+    poll_interval = 0.005
+    ring: ShmRing
+
+    @property
+    def source(self) -> str:
+        return f"shm://{self.pv}"
+
+    async def connect(self):
+        # Wait for the publisher to create the ring, then its first value
+        while True:
+            try:
+                self.ring = ShmRing.attach(shm_name(self.pv))
+            except FileNotFoundError:
+                await asyncio.sleep(self.poll_interval)
+            else:
+                break
+        while not self.ring.write_seq:
+            await asyncio.sleep(self.poll_interval)
+
+    async def put(self, value: T, wait=True):
+        raise NotImplementedError(f"Can't put to {self.source} as it is read only")
+
+    def _read(self, seq: int) -> Optional[Tuple[Reading, T]]:
+        update = self.ring.read(seq)
+        if update is None:
+            return None
+        value, timestamp, severity = update
+        reading = CompactReading(value, timestamp, severity)
+        return cast(Reading, reading), cast(T, value)
+
+    def _read_latest(self) -> Tuple[int, Reading, T]:
+        while True:
+            seq = self.ring.write_seq
+            update = self._read(seq)
+            if update:
+                return (seq, *update)
+
+    async def get_descriptor(self) -> Descriptor:
+        value = (await self.get_reading())["value"]
+        return dict(source=self.source, dtype="array", shape=[len(value)])
+
+    async def get_reading(self) -> Reading:
+        return self._read_latest()[1]
+
+    async def get_value(self) -> T:
+        return self._read_latest()[2]
+
+    async def _poll(self, callback: PvCallback[T], seq: int):
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            latest = self.ring.write_seq
+            # Deliver the updates still in the ring in order, skipping any
+            # that were overwritten before we got to them
+            oldest = max(seq + 1, latest - self.ring.slots + 1)
+            for update in map(self._read, range(oldest, latest + 1)):
+                if update:
+                    callback(*update)
+            seq = latest
+
+    def monitor_reading_value(self, callback: PvCallback[T]) -> Monitor:
+        seq, reading, value = self._read_latest()
+        callback(reading, value)
+        return TaskMonitor(asyncio.create_task(self._poll(callback, seq)))
@@ -2,12 +2,13 @@ from __future__ import annotations
 
 import asyncio
 import time
-from typing import Dict, Generic, List, Sequence, Type, TypeVar
+from typing import Dict, Generic, List, Sequence, Type, TypeVar, cast
 
 from bluesky.protocols import Descriptor, Dtype, Reading
 from typing_extensions import Protocol
 
-from .core import Monitor, T
+from .core import CompactReading, Monitor, T
+from .looplag import running_callback
 from .pv import Pv, PvCallback
 
 primitive_dtypes: Dict[type, Dtype] = {
@@ -50,6 +51,7 @@ class SimMonitor(Generic[T]):
 class PvSim(Pv[T]):
     value: T
     timestamp: float
+    reading: Reading
 
     def __init__(self, pv: str, datatype: Type[T]):
         super().__init__(pv, datatype)
@@ -73,10 +75,6 @@ class PvSim(Pv[T]):
     async def get_descriptor(self) -> Descriptor:
         return make_sim_descriptor(self.source, self.value)
 
-    @property
-    def reading(self) -> Reading:
-        return dict(value=self.value, timestamp=self.timestamp)
-
     async def get_reading(self) -> Reading:
         return self.reading
 
@@ -90,5 +88,14 @@ class PvSim(Pv[T]):
     def set_value(self, value: T) -> None:
         self.value = value
         self.timestamp = time.time()
-        for rl in self._listeners:
-            rl.callback(self.reading, self.value)
+        # Made once, then shared by get_reading and all the listeners
+        self.reading = cast(Reading, CompactReading(value, self.timestamp))
+        # Let LoopLagMonitor know who to blame if a callback blocks
+        outer_callback, outer_pv = running_callback.callback, running_callback.pv
+        running_callback.pv = self
+        try:
+            for rl in self._listeners:
+                running_callback.callback = rl.callback
+                rl.callback(self.reading, self.value)
+        finally:
+            running_callback.callback, running_callback.pv = outer_callback, outer_pv
@@ -0,0 +1,198 @@
+import asyncio
+import importlib
+import logging
+import math
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Type
+
+from bluesky.protocols import Reading
+
+from .core import CommsConnector, SignalR
+from .epics import EpicsComm, EpicsSignalRO, PvCa
+from .pv import Pv
+
+
+class NotConnectedError(Exception):
+    """None of the PVs or devices to monitor connected"""
+
+
+class PvStats:
+    """Update statistics of a single PV, accumulated without storing updates.
+
+    Latency is from the IOC timestamp to the callback being run, so includes
+    any clock difference between the IOC host and this one"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.count = 0
+        self.first_arrival = 0.0
+        self.last_arrival = 0.0
+        # Running mean and sum of squared deviations of inter-arrival times
+        self._interval_mean = 0.0
+        self._interval_m2 = 0.0
+        self.latency_total = 0.0
+        self.latency_max = 0.0
+        # Updates since the last live display
+        self.window_count = 0
+
+    def update(self, reading: Reading):
+        arrival = time.monotonic()
+        if self.count == 0:
+            # The first update is the current value, which may be old, so
+            # don't count it towards latency
+            self.first_arrival = arrival
+        else:
+            latency = time.time() - reading["timestamp"]
+            self.latency_total += latency
+            self.latency_max = max(self.latency_max, latency)
+            # Welford's algorithm, self.count is the number of intervals
+            interval = arrival - self.last_arrival
+            delta = interval - self._interval_mean
+            self._interval_mean += delta / self.count
+            self._interval_m2 += delta * (interval - self._interval_mean)
+        self.last_arrival = arrival
+        self.count += 1
+        self.window_count += 1
+
+    @property
+    def rate(self) -> float:
+        """Mean updates per second"""
+        elapsed = self.last_arrival - self.first_arrival
+        return (self.count - 1) / elapsed if elapsed > 0 else 0.0
+
+    @property
+    def jitter(self) -> float:
+        """Standard deviation of the time between updates in seconds"""
+        intervals = self.count - 1
+        return math.sqrt(self._interval_m2 / intervals) if intervals > 1 else 0.0
+
+    @property
+    def latency(self) -> float:
+        """Mean latency in seconds"""
+        return self.latency_total / (self.count - 1) if self.count > 1 else 0.0
+
+
+def format_stats(stats: Iterable[PvStats], window: Optional[float] = None) -> str:
+    """Table of stats. If window is given, the rate is the one since the last
+    call rather than the mean"""
+    rows = [("PV", "updates", "rate/s", "jitter/ms", "latency/ms", "max/ms")]
+    for s in stats:
+        if window is None:
+            rate = s.rate
+        else:
+            rate = s.window_count / window if window > 0 else 0.0
+            s.window_count = 0
+        rows.append(
+            (
+                s.name,
+                str(s.count),
+                f"{rate:.1f}",
+                f"{s.jitter * 1000:.2f}",
+                f"{s.latency * 1000:.2f}",
+                f"{s.latency_max * 1000:.2f}",
+            )
+        )
+    widths = [max(len(row[i]) for row in rows) for i in range(len(rows[0]))]
+    return "\n".join(
+        row[0].ljust(widths[0])
+        + "".join(f"  {col:>{w}}" for col, w in zip(row[1:], widths[1:]))
+        for row in rows
+    )
+
+
+async def monitor_signals(
+    signals: Dict[str, SignalR],
+    duration: Optional[float] = None,
+    interval: float = 1.0,
+    coalesce: bool = False,
+    output: Callable[[str], None] = print,
+) -> Dict[str, PvStats]:
+    """Monitor signals through their PvCache for duration seconds, or until
+    cancelled, outputting a table of stats every interval seconds (if non-zero)
+    and a summary at the end. If coalesce, measure updates as a coalesced
+    monitor would see them"""
+    stats = {name: PvStats(name) for name in signals}
+    monitors = [
+        signal.monitor_reading(stats[name].update, coalesce=coalesce)
+        for name, signal in signals.items()
+    ]
+    deadline = None if duration is None else time.monotonic() + duration
+    try:
+        last_display = time.monotonic()
+        while deadline is None or time.monotonic() < deadline:
+            wait = interval or None
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                wait = min(wait, remaining) if wait else remaining
+            if wait is None:
+                # No display or deadline, so wait to be cancelled
+                await asyncio.Event().wait()
+            else:
+                await asyncio.sleep(wait)
+            now = time.monotonic()
+            if interval and (deadline is None or now < deadline):
+                output(format_stats(stats.values(), window=now - last_display))
+                last_display = now
+    finally:
+        for monitor in monitors:
+            monitor.close()
+        output("Summary:\n" + format_stats(stats.values()))
+    return stats
+
+
+async def connect_pvs(
+    pvs: List[str], pv_cls: Type[Pv] = PvCa, timeout: float = 10.0
+) -> Dict[str, SignalR]:
+    """Connect a signal of the PV's native type to each of pvs, logging and
+    leaving out those that don't connect within timeout"""
+    signals: Dict[str, SignalR] = {}
+    connecting = []
+    for pv in pvs:
+        signal = EpicsSignalRO(pv_cls, object)
+        signals[pv] = signal
+        connecting.append(asyncio.wait_for(signal.connect(pv), timeout))
+    results = await asyncio.gather(*connecting, return_exceptions=True)
+    for pv, result in zip(pvs, results):
+        if isinstance(result, BaseException):
+            logging.error(f"{pv} not connected: {result!r}")
+            signals.pop(pv, None)
+    return signals
+
+
+async def connect_devices(
+    factory: str, prefixes: List[str], sim_mode=False, timeout: float = 10.0
+) -> Dict[str, SignalR]:
+    """Make a device for each of prefixes with factory, like
+    "ophyd_epics_devices.motor:motor", returning all of their readable signals
+    named by source"""
+    module_name, func_name = factory.split(":")
+    make_device = getattr(importlib.import_module(module_name), func_name)
+    async with CommsConnector(sim_mode=sim_mode, timeout=timeout):
+        devices = [make_device(prefix) for prefix in prefixes]
+    signals: Dict[str, SignalR] = {}
+    for device in devices:
+        comms = [device] + list(vars(device).values())
+        for comm in comms:
+            if isinstance(comm, EpicsComm):
+                for signal in comm._signals_.values():
+                    if isinstance(signal, SignalR):
+                        signals[signal.source] = signal
+    return signals
+
+
+async def run_monitor(
+    pvs: List[str],
+    factory: Optional[str] = None,
+    duration: Optional[float] = None,
+    interval: float = 1.0,
+    coalesce: bool = False,
+    timeout: float = 10.0,
+):
+    """Entry point for `ophyd monitor`"""
+    if factory:
+        signals = await connect_devices(factory, pvs, timeout=timeout)
+    else:
+        signals = await connect_pvs(pvs, timeout=timeout)
+    if not signals:
+        raise NotConnectedError(f"None of {pvs} connected within {timeout}s")
+    await monitor_signals(signals, duration, interval, coalesce)
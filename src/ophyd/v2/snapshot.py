@@ -0,0 +1,104 @@
+import asyncio
+import json
+from enum import Enum
+from pathlib import Path
+from typing import Any, Dict, List, Type, Union
+
+import numpy as np
+from bluesky.protocols import Reading
+
+from .epics import EpicsComm, EpicsSignalRW
+from .pv import Pv
+
+Signals = Dict[str, EpicsSignalRW]
+
+
+def writable_signals(comms: Dict[str, EpicsComm]) -> Signals:
+    """All the read-write signals of comms, named like "t1x.velocity" """
+    return {
+        f"{comm_name}.{name}": signal
+        for comm_name, comm in comms.items()
+        for name, signal in comm._signals_.items()
+        if isinstance(signal, EpicsSignalRW)
+    }
+
+
+async def _get_readings(signals: Signals) -> Dict[str, Reading]:
+    # Group the demand PVs by transport so each can batch its gets
+    by_pv_cls: Dict[Type[Pv], List[str]] = {}
+    for name, signal in signals.items():
+        by_pv_cls.setdefault(type(signal.write_pv), []).append(name)
+
+    async def get_group(pv_cls: Type[Pv], names: List[str]) -> List[Reading]:
+        return await pv_cls.get_readings([signals[name].write_pv for name in names])
+
+    groups = list(by_pv_cls.items())
+    results = await asyncio.gather(*[get_group(*group) for group in groups])
+    readings: Dict[str, Reading] = {}
+    for (_, names), group_readings in zip(groups, results):
+        readings.update(zip(names, group_readings))
+    return readings
+
+
+def _to_json(value) -> Any:
+    if isinstance(value, Enum):
+        return value.value
+    elif isinstance(value, np.ndarray):
+        return value.tolist()
+    return value
+
+
+def _from_json(datatype: Type, value) -> Any:
+    if isinstance(value, list):
+        return np.array(value)
+    return datatype(value)
+
+
+def _differs(a, b) -> bool:
+    return not np.array_equal(a, b)
+
+
+async def save_snapshot(signals: Signals, path: Union[str, Path]) -> Dict[str, Any]:
+    """Concurrently read the demand values of signals, and write them with their
+    datatype and timestamp to a JSON file at path. Returns the snapshot"""
+    readings = await _get_readings(signals)
+    snapshot = {
+        name: [
+            _to_json(reading["value"]),
+            signals[name]._datatype.__name__,
+            reading["timestamp"],
+        ]
+        for name, reading in readings.items()
+    }
+    Path(path).write_text(json.dumps(snapshot, separators=(",", ":")))
+    return snapshot
+
+
+async def restore_snapshot(
+    signals: Signals, path: Union[str, Path], max_concurrency: int = 100
+) -> List[str]:
+    """Load a snapshot written by save_snapshot, and put the values that differ
+    from the current demand values, at most max_concurrency at a time.
+
+    Snapshot entries without a signal, and signals without a snapshot entry, are
+    ignored. Returns the names of the signals that were put to"""
+    snapshot = json.loads(Path(path).read_text())
+    to_check = {name: signals[name] for name in snapshot if name in signals}
+    current = await _get_readings(to_check)
+    targets = {
+        name: _from_json(signal._datatype, snapshot[name][0])
+        for name, signal in to_check.items()
+    }
+    changed = [
+        name
+        for name, target in targets.items()
+        if _differs(current[name]["value"], target)
+    ]
+    for i in range(0, len(changed), max_concurrency):
+        await asyncio.gather(
+            *[
+                signals[name].put(targets[name])
+                for name in changed[i : i + max_concurrency]
+            ]
+        )
+    return changed
@@ -0,0 +1,115 @@
+import asyncio
+import json
+import os
+import reprlib
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from pathlib import Path
+from typing import Any, ContextManager, Dict, Iterator, List, Optional, Union
+
+
+def describe_callback(callback) -> str:
+    """The qualified name of a callback, looking through monitor wrappers"""
+    callback = getattr(callback, "_callback", callback)
+    return getattr(callback, "__qualname__", repr(callback))
+
+
+def _describe_args(args: Dict[str, Any]) -> Dict[str, Any]:
+    # Callers pass raw objects so nothing is formatted unless we're tracing, and
+    # values are abbreviated so a large array doesn't make a huge trace
+    if "callback" in args:
+        args["callback"] = describe_callback(args["callback"])
+    if "value" in args:
+        args["value"] = reprlib.repr(args["value"])
+    return args
+
+
+class Tracer:
+    """Record spans of device operations, to be exported as a Chrome trace that
+    can be viewed in Perfetto or chrome://tracing.
+
+    Timestamps come from time.monotonic(), which is what the event loop uses,
+    and each asyncio Task gets its own lane so concurrency is visible"""
+
+    def __init__(self):
+        self.events: List[Dict[str, Any]] = []
+        self._lanes: Dict[str, int] = {}
+
+    def _lane(self) -> int:
+        try:
+            task = asyncio.current_task()
+        except RuntimeError:
+            # Not in the event loop thread
+            name = threading.current_thread().name
+        else:
+            if task is None:
+                name = "event loop callbacks"
+            elif hasattr(task, "get_name"):
+                name = task.get_name()
+            else:
+                # Tasks don't have names before Python 3.8
+                name = f"Task-{id(task):x}"
+        return self._lanes.setdefault(name, len(self._lanes))
+
+    @contextmanager
+    def span(self, name: str, **args) -> Iterator[None]:
+        lane = self._lane()
+        args = _describe_args(args)
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            end = time.monotonic()
+            self.events.append(
+                dict(
+                    name=name,
+                    ph="X",
+                    ts=start * 1e6,
+                    dur=(end - start) * 1e6,
+                    pid=os.getpid(),
+                    tid=lane,
+                    args=args,
+                )
+            )
+
+    def to_chrome_trace(self) -> Dict[str, Any]:
+        pid = os.getpid()
+        lane_names = [
+            dict(name="thread_name", ph="M", pid=pid, tid=lane, args=dict(name=name))
+            for name, lane in self._lanes.items()
+        ]
+        return dict(traceEvents=lane_names + self.events, displayTimeUnit="ms")
+
+    def export(self, path: Union[str, Path]):
+        """Write the trace as Chrome trace JSON"""
+        Path(path).write_text(json.dumps(self.to_chrome_trace()))
+
+
+_tracer: Optional[Tracer] = None
+_null_span = nullcontext()
+
+
+def start_tracing() -> Tracer:
+    """Start recording spans into a new Tracer"""
+    global _tracer
+    _tracer = Tracer()
+    return _tracer
+
+
+def stop_tracing() -> Optional[Tracer]:
+    """Stop recording spans, returning the Tracer that recorded them"""
+    global _tracer
+    tracer, _tracer = _tracer, None
+    return tracer
+
+
+def get_tracer() -> Optional[Tracer]:
+    return _tracer
+
+
+def span(name: str, **args) -> ContextManager:
+    """Record a span in the current Tracer, if tracing"""
+    if _tracer is None:
+        return _null_span
+    return _tracer.span(name, **args)
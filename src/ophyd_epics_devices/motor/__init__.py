@@ -1,11 +1,15 @@
+from typing import Optional
+
 from ophyd.v2.core import named
 
 from . import comms, devices
 
 
-def motor(signal_prefix: str, name="") -> devices.Motor:
+def motor(
+    signal_prefix: str, name="", completion: Optional[devices.MoveCompletion] = None
+) -> devices.Motor:
     c = comms.MotorComm(signal_prefix)
-    return named(devices.Motor(c), name)
+    return named(devices.Motor(c, completion), name)
 
 
 EpicsMotor = motor
@@ -20,6 +20,10 @@ class MotorComm(EpicsComm):
     offset: EpicsSignalRO[float]
     egu: EpicsSignalRO[str]
     precision: EpicsSignalRO[float]
+    high_limit: EpicsSignalRW[float]
+    low_limit: EpicsSignalRW[float]
+    dial_high_limit: EpicsSignalRW[float]
+    dial_low_limit: EpicsSignalRW[float]
     stop: EpicsSignalX
 
 
@@ -37,6 +41,10 @@ async def motor_v33_connector(comm: MotorComm, pv_prefix: str):
         comm.offset.connect(f"{pv_prefix}.OFF"),
         comm.egu.connect(f"{pv_prefix}.EGU"),
         comm.precision.connect(f"{pv_prefix}.PREC"),
+        comm.high_limit.connect(f"{pv_prefix}.HLM"),
+        comm.low_limit.connect(f"{pv_prefix}.LLM"),
+        comm.dial_high_limit.connect(f"{pv_prefix}.DHLM"),
+        comm.dial_low_limit.connect(f"{pv_prefix}.DLLM"),
         comm.stop.connect(f"{pv_prefix}.STOP", 1, wait=False),
     )
 
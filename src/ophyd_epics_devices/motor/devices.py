@@ -1,25 +1,153 @@
 import asyncio
 import time
-from typing import Callable, Dict, List
+from typing import Any, Callable, Dict, Iterator, List, Optional
 
 from bluesky.protocols import (
     Descriptor,
+    Flyable,
     Movable,
+    PartialEvent,
     Readable,
     Reading,
     Stageable,
     Stoppable,
 )
+from typing_extensions import Protocol
 
-from ophyd.v2.core import AsyncStatus, Device, Signal, SignalCollection, SignalDevice
+from ophyd.v2.buffer import ReadingBuffer
+from ophyd.v2.core import (
+    AsyncStatus,
+    Callback,
+    Device,
+    Monitor,
+    Signal,
+    SignalCollection,
+    SignalDevice,
+    register_move,
+)
+from ophyd.v2.tracing import span
 
 from .comms import MotorComm
 
 
-class Motor(Device, Movable, Readable, Stoppable, Stageable):
-    def __init__(self, comm: MotorComm):
+class MoveCompletion(Protocol):
+    # Puts new_position to the demand, returning when the move is complete
+    async def __call__(self, motor: "Motor", new_position: float):
+        ...
+
+
+class PutCallbackCompletion:
+    """Done when the put to the demand PV calls back"""
+
+    async def __call__(self, motor: "Motor", new_position: float):
+        await motor.comm.demand.put(new_position)
+
+
+class DoneMoveCompletion:
+    """Done when the done_move PV goes from 0 to 1 after the demand is put, or
+    when the put calls back or the motor is stopped if that is sooner"""
+
+    async def _wait_for_done_move(self, q: "asyncio.Queue[bool]", moving: bool):
+        if not moving:
+            # Wait for the move to start
+            while await q.get():
+                pass
+        while not await q.get():
+            pass
+
+    async def __call__(self, motor: "Motor", new_position: float):
+        q: asyncio.Queue[bool] = asyncio.Queue()
+        monitor = motor.comm.done_move.monitor_value(q.put_nowait)
+        tasks: List[asyncio.Task] = []
+        assert motor._stopped, "Completion must be called from Motor.set()"
+        try:
+            # A motor that is already moving is retargeted by the put, so
+            # done_move won't drop before it rises
+            moving = not await q.get()
+            while not q.empty():
+                moving = not q.get_nowait()
+            put = asyncio.create_task(motor.comm.demand.put(new_position))
+            # The put callback covers a no-op move whose brief 0 isn't seen
+            tasks = [
+                put,
+                asyncio.create_task(self._wait_for_done_move(q, moving)),
+                asyncio.create_task(motor._stopped.wait()),
+            ]
+            done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+            if put in done:
+                put.result()
+        finally:
+            for task in tasks:
+                task.cancel()
+            monitor.close()
+
+
+class ToleranceCompletion:
+    """Done when the readback has been within tolerance of new_position for
+    settle_time seconds, or when the motor is stopped"""
+
+    def __init__(self, tolerance: float, settle_time: float = 0.0):
+        self.tolerance = tolerance
+        self.settle_time = settle_time
+
+    async def __call__(self, motor: "Motor", new_position: float):
+        in_position, out_of_position = asyncio.Event(), asyncio.Event()
+
+        def check_position(position: float):
+            if abs(position - new_position) <= self.tolerance:
+                out_of_position.clear()
+                in_position.set()
+            else:
+                in_position.clear()
+                out_of_position.set()
+
+        async def wait_for_settle():
+            while True:
+                await in_position.wait()
+                try:
+                    await asyncio.wait_for(
+                        out_of_position.wait(), timeout=self.settle_time
+                    )
+                except asyncio.TimeoutError:
+                    # Stayed in position for the whole settle time
+                    return
+
+        assert motor._stopped, "Completion must be called from Motor.set()"
+        motor._readback_listeners.append(check_position)
+        tasks = [
+            asyncio.create_task(wait_for_settle()),
+            asyncio.create_task(motor._stopped.wait()),
+        ]
+        try:
+            if motor._readback is not None:
+                check_position(motor._readback)
+            await motor.comm.demand.put(new_position, wait=False)
+            await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for task in tasks:
+                task.cancel()
+            motor._readback_listeners.remove(check_position)
+
+
+class Motor(Device, Movable, Readable, Stoppable, Stageable, Flyable):
+    def __init__(self, comm: MotorComm, completion: Optional[MoveCompletion] = None):
         self.comm: MotorComm = comm
+        self.completion = completion or PutCallbackCompletion()
         self._set_success = True
+        # Made by each set(), so it belongs to the loop the move runs in
+        self._stopped: Optional[asyncio.Event] = None
+        # A single readback monitor shared by all moves, held open while
+        # staged or while any move is in progress
+        self._readback_monitor: Optional[Monitor] = None
+        self._readback_users = 0
+        self._staged = False
+        self._readback: Optional[float] = None
+        self._readback_listeners: List[Callback[float]] = []
+        # Readback positions captured during a fly move
+        self._fly_target: Optional[float] = None
+        self._fly_status: Optional[AsyncStatus[float]] = None
+        self._fly_monitor: Optional[Monitor] = None
+        self._fly_buffer = ReadingBuffer()
         # These signal collections will be cached while staged
         self._conf_signals = SignalCollection(
             velocity=self.comm.velocity,
@@ -28,6 +156,14 @@ class Motor(Device, Movable, Readable, Stoppable, Stageable):
         self._read_signals = SignalCollection(
             readback=self.comm.readback,
         )
+        # User limits are cached from the first move onwards so that targets
+        # can be checked without going to the IOC. Dial limits don't need
+        # checking as the IOC derives the user limits from them
+        self._limit_signals = SignalCollection(
+            high_limit=self.comm.high_limit,
+            low_limit=self.comm.low_limit,
+        )
+        self._limits_cached = False
 
     @Device.name.setter  # type: ignore
     def name(self, name: str):
@@ -42,13 +178,41 @@ class Motor(Device, Movable, Readable, Stoppable, Stageable):
         assert isinstance(signal, Signal)
         return SignalDevice(signal, f"{self.name}-{name}")
 
+    def _readback_changed(self, value: float):
+        self._readback = value
+        for listener in self._readback_listeners:
+            listener(value)
+
+    def _acquire_readback(self):
+        if self._readback_users == 0:
+            self._readback_monitor = self.comm.readback.monitor_value(
+                self._readback_changed
+            )
+        self._readback_users += 1
+
+    def _release_readback(self):
+        assert self._readback_users > 0, "Readback released more than acquired"
+        self._readback_users -= 1
+        if self._readback_users == 0:
+            assert self._readback_monitor, "Why is there no monitor"
+            self._readback_monitor.close()
+            self._readback_monitor = None
+            self._readback = None
+
     def stage(self):
-        # Start caching signals
+        # Start caching signals, holding one readback user however many times
+        # we are staged
+        if not self._staged:
+            self._staged = True
+            self._acquire_readback()
         self._read_signals.set_caching(True)
         self._conf_signals.set_caching(True)
 
     def unstage(self):
         # Stop caching signals
+        if self._staged:
+            self._staged = False
+            self._release_readback()
         self._read_signals.set_caching(False)
         self._conf_signals.set_caching(False)
 
@@ -64,16 +228,38 @@ class Motor(Device, Movable, Readable, Stoppable, Stageable):
     async def describe_configuration(self) -> Dict[str, Descriptor]:
         return await self._conf_signals.describe(self.name + "-")
 
+    def configure_changed(self, values: Dict[str, Any]) -> AsyncStatus[List[str]]:
+        """Put the configuration signals that differ from values, like
+        {"velocity": 2.0}. Not called configure() as bluesky expects that to
+        synchronously return (old, new) readings"""
+        return AsyncStatus(self._conf_signals.configure(values))
+
+    async def _check_limits(self, new_position: float):
+        if not self._limits_cached:
+            self._limit_signals.set_caching(True)
+            self._limits_cached = True
+        high_limit = await self.comm.high_limit.get_value()
+        low_limit = await self.comm.low_limit.get_value()
+        # The motor record disables limits if they are equal
+        if low_limit != high_limit and not low_limit <= new_position <= high_limit:
+            raise ValueError(
+                f"{self.name} target {new_position} outside limits "
+                f"[{low_limit}, {high_limit}]"
+            )
+
     def set(self, new_position: float, timeout: float = None) -> AsyncStatus[float]:
         start = time.time()
         watchers: List[Callable] = []
 
         async def do_set():
-            old_position, units, precision = await asyncio.gather(
-                self.comm.demand.get_value(),
-                self.comm.egu.get_value(),
-                self.comm.precision.get_value(),
-            )
+            with span("Motor.set.check_limits", device=self.name):
+                await self._check_limits(new_position)
+            with span("Motor.set.get_initial", device=self.name):
+                old_position, units, precision = await asyncio.gather(
+                    self.comm.demand.get_value(),
+                    self.comm.egu.get_value(),
+                    self.comm.precision.get_value(),
+                )
 
             def update_watchers(current_position: float):
                 for watcher in watchers:
@@ -87,18 +273,81 @@ class Motor(Device, Movable, Readable, Stoppable, Stageable):
                         time_elapsed=time.time() - start,
                     )
 
-            monitor = self.comm.readback.monitor_value(update_watchers)
+            self._acquire_readback()
+            self._readback_listeners.append(update_watchers)
             try:
-                await self.comm.demand.put(new_position)
+                if self._readback is not None:
+                    update_watchers(self._readback)
+                with span(
+                    "Motor.set.move",
+                    device=self.name,
+                    target=new_position,
+                    completion=type(self.completion).__name__,
+                ):
+                    await self.completion(self, new_position)
             finally:
-                monitor.close()
+                self._readback_listeners.remove(update_watchers)
+                self._release_readback()
             if not self._set_success:
                 raise RuntimeError("Motor was stopped")
 
         self._set_success = True
+        self._stopped = asyncio.Event()
         status = AsyncStatus(asyncio.wait_for(do_set(), timeout=timeout), watchers)
-        return status
+        return register_move(status, self)
 
     async def stop(self, success=False) -> None:
         self._set_success = success
+        if self._stopped:
+            self._stopped.set()
         await self.comm.stop.execute()
+
+    def set_fly_target(self, target: float):
+        """Set the position that kickoff() will move to"""
+        self._fly_target = target
+
+    def kickoff(self) -> AsyncStatus:
+        async def do_kickoff():
+            assert self._fly_target is not None, "set_fly_target() not called"
+            self._fly_buffer.clear()
+            self._fly_monitor = self.comm.readback.monitor_reading(
+                self._fly_buffer.append_reading
+            )
+            self._fly_status = self.set(self._fly_target)
+
+        return AsyncStatus(do_kickoff())
+
+    def complete(self) -> AsyncStatus:
+        async def do_complete():
+            assert self._fly_status, "kickoff() not called"
+            try:
+                await self._fly_status
+            finally:
+                assert self._fly_monitor, "Why is there no monitor"
+                self._fly_monitor.close()
+                self._fly_monitor = None
+
+        return AsyncStatus(do_complete())
+
+    async def describe_collect(self) -> Dict[str, Dict[str, Descriptor]]:
+        return {self.name: await self.describe()}
+
+    def collect_pages(self) -> Iterator[Dict[str, Any]]:
+        """Yield the captured readbacks as a single event page of arrays"""
+        key = f"{self.name}-readback"
+        timestamps = self._fly_buffer.timestamps.copy()
+        yield dict(
+            time=timestamps,
+            data={key: self._fly_buffer.values.copy()},
+            timestamps={key: timestamps},
+        )
+        self._fly_buffer.clear()
+
+    def collect(self) -> Iterator[PartialEvent]:
+        for page in self.collect_pages():
+            for i, t in enumerate(page["time"]):
+                yield dict(
+                    time=float(t),
+                    data={k: v[i].item() for k, v in page["data"].items()},
+                    timestamps={k: float(v[i]) for k, v in page["timestamps"].items()},
+                )
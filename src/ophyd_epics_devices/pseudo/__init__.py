@@ -0,0 +1,34 @@
+from ophyd.v2.core import named
+
+from ..motor.devices import Motor
+from . import devices, transforms
+
+
+async def slits(positive: Motor, negative: Motor, name="") -> devices.Slits:
+    """Gap and centre of a pair of slit blades"""
+    positioner = devices.Slits(
+        transforms.SlitTransform(), dict(positive=positive, negative=negative)
+    )
+    await positioner.connect()
+    return named(positioner, name)
+
+
+async def table(
+    upstream: Motor,
+    downstream_in: Motor,
+    downstream_out: Motor,
+    length: float,
+    width: float,
+    name="",
+) -> devices.Table:
+    """Height, pitch and roll of a table on three jacks"""
+    positioner = devices.Table(
+        transforms.TableTransform(length, width),
+        dict(
+            upstream=upstream,
+            downstream_in=downstream_in,
+            downstream_out=downstream_out,
+        ),
+    )
+    await positioner.connect()
+    return named(positioner, name)
@@ -0,0 +1,146 @@
+import asyncio
+from functools import partial
+from typing import Any, Dict, List, Optional
+
+from bluesky.protocols import Descriptor, Movable, Readable, Reading, Stoppable
+
+from ophyd.v2.core import AsyncStatus, Device, SignalR
+from ophyd.v2.derived import derived_signal
+from ophyd.v2.tracing import span
+
+from ..motor.devices import Motor
+from .transforms import Arrays, Positions, Transform
+
+
+def _forward_axis(transform: Transform, axis: str, **real: float):
+    return transform.forward(real)[axis]
+
+
+class PseudoMotor(Device, Movable, Readable, Stoppable):
+    """A single pseudo axis of a PseudoPositioner"""
+
+    def __init__(self, positioner: "PseudoPositioner", axis: str):
+        self.positioner = positioner
+        self.axis = axis
+
+    @property
+    def readback(self) -> SignalR[float]:
+        return self.positioner._readbacks[self.axis]
+
+    async def read(self) -> Dict[str, Reading]:
+        return {f"{self.name}-readback": await self.readback.get_reading()}
+
+    async def describe(self) -> Dict[str, Descriptor]:
+        return {f"{self.name}-readback": await self.readback.get_descriptor()}
+
+    def set(self, new_position: float, timeout: Optional[float] = None) -> AsyncStatus:
+        return self.positioner.set({self.axis: new_position}, timeout)
+
+    async def stop(self, success=False) -> None:
+        await self.positioner.stop(success)
+
+
+class PseudoPositioner(Device, Movable, Readable, Stoppable):
+    """Pseudo axes over real Motors, converted by a vectorised Transform.
+
+    The pseudo readbacks are derived signals of the real readbacks, so update
+    incrementally while monitored. Moving pseudo axes holds the others at the
+    positions given by the real demands, and moves the real motors concurrently"""
+
+    def __init__(self, transform: Transform, real: Dict[str, Motor]):
+        assert set(real) == set(
+            transform.real_axes
+        ), f"Expected real motors {list(transform.real_axes)}, got {list(real)}"
+        self.transform = transform
+        self.real = real
+        self._readbacks: Dict[str, SignalR[float]] = {}
+        # Pseudo motors are available as attributes, like slits.gap
+        self.axes = {axis: PseudoMotor(self, axis) for axis in transform.pseudo_axes}
+        for axis, pseudo_motor in self.axes.items():
+            setattr(self, axis, pseudo_motor)
+
+    @Device.name.setter  # type: ignore
+    def name(self, name: str):
+        self._name = name
+        for axis, pseudo_motor in self.axes.items():
+            pseudo_motor.name = f"{name}-{axis}"
+
+    async def connect(self):
+        """Make the pseudo readbacks, once the real motors are connected"""
+        real_readbacks = {k: m.comm.readback for k, m in self.real.items()}
+        sources = ",".join(r.source for r in real_readbacks.values())
+        for axis in self.transform.pseudo_axes:
+            self._readbacks[axis] = await derived_signal(
+                f"{axis}({sources})",
+                partial(_forward_axis, self.transform, axis),
+                float,
+                **real_readbacks,
+            )
+
+    async def read(self) -> Dict[str, Reading]:
+        readings: Dict[str, Reading] = {}
+        for axis_readings in await asyncio.gather(
+            *[m.read() for m in self.axes.values()]
+        ):
+            readings.update(axis_readings)
+        return readings
+
+    async def describe(self) -> Dict[str, Descriptor]:
+        descriptors: Dict[str, Descriptor] = {}
+        for axis_descriptors in await asyncio.gather(
+            *[m.describe() for m in self.axes.values()]
+        ):
+            descriptors.update(axis_descriptors)
+        return descriptors
+
+    def forward(self, real: Positions) -> Arrays:
+        """Pseudo positions or trajectories from real ones"""
+        return self.transform.forward(real)
+
+    def inverse(self, pseudo: Positions) -> Arrays:
+        """Real positions or trajectories from pseudo ones"""
+        return self.transform.inverse(pseudo)
+
+    async def _real_demands(self) -> Dict[str, float]:
+        axes = list(self.real)
+        demands = await asyncio.gather(
+            *[self.real[axis].comm.demand.get_value() for axis in axes]
+        )
+        return dict(zip(axes, demands))
+
+    def set(
+        self, new_positions: Dict[str, float], timeout: Optional[float] = None
+    ) -> AsyncStatus:
+        """Move the given pseudo axes, like {"gap": 1.5}"""
+        unknown = set(new_positions) - set(self.transform.pseudo_axes)
+        assert not unknown, f"{self.name} has no pseudo axes {sorted(unknown)}"
+
+        async def do_set():
+            with span("PseudoPositioner.set", device=self.name):
+                pseudo: Dict[str, Any] = self.transform.forward(
+                    await self._real_demands()
+                )
+                pseudo.update(new_positions)
+                targets = self.transform.inverse(pseudo)
+                statuses: List[AsyncStatus] = [
+                    motor.set(float(targets[axis]), timeout)
+                    for axis, motor in self.real.items()
+                ]
+                await asyncio.gather(*statuses)
+
+        # Each real Motor.set registers itself, so stop_all stops them once
+        return AsyncStatus(do_set())
+
+    async def stop(self, success=False) -> None:
+        await asyncio.gather(*[motor.stop(success) for motor in self.real.values()])
+
+
+class Slits(PseudoPositioner):
+    gap: PseudoMotor
+    centre: PseudoMotor
+
+
+class Table(PseudoPositioner):
+    height: PseudoMotor
+    pitch: PseudoMotor
+    roll: PseudoMotor
@@ -0,0 +1,76 @@
+from typing import Dict, Mapping, Sequence, Union
+
+import numpy as np
+from typing_extensions import Protocol
+
+# Positions of each axis, either single positions or whole trajectories
+Positions = Mapping[str, Union[float, np.ndarray]]
+# Transforms always return arrays, 0-dimensional for single positions
+Arrays = Dict[str, np.ndarray]
+
+
+class Transform(Protocol):
+    #: Names of the real axes, in the order they should be passed
+    real_axes: Sequence[str]
+    #: Names of the pseudo axes
+    pseudo_axes: Sequence[str]
+
+    def forward(self, real: Positions) -> Arrays:
+        """Pseudo positions of all pseudo axes from positions of all real axes.
+        Must be vectorised so arrays of positions can be converted at once"""
+
+    def inverse(self, pseudo: Positions) -> Arrays:
+        """Real positions of all real axes from positions of all pseudo axes.
+        Must be vectorised so arrays of positions can be converted at once"""
+
+
+class SlitTransform:
+    """A pair of slit blades, moving in the same direction, as a gap and centre"""
+
+    real_axes: Sequence[str] = ("positive", "negative")
+    pseudo_axes: Sequence[str] = ("gap", "centre")
+
+    def forward(self, real: Positions) -> Arrays:
+        positive, negative = np.asarray(real["positive"]), np.asarray(real["negative"])
+        return dict(gap=positive - negative, centre=(positive + negative) / 2)
+
+    def inverse(self, pseudo: Positions) -> Arrays:
+        gap, centre = np.asarray(pseudo["gap"]), np.asarray(pseudo["centre"])
+        return dict(positive=centre + gap / 2, negative=centre - gap / 2)
+
+
+class TableTransform:
+    """A table on three vertical jacks as height, pitch and roll in radians.
+
+    upstream is on the beam axis, and downstream_in and downstream_out are
+    length downstream of it, width apart across the beam. Height is measured
+    halfway between upstream and the middle of the downstream jacks"""
+
+    real_axes: Sequence[str] = ("upstream", "downstream_in", "downstream_out")
+    pseudo_axes: Sequence[str] = ("height", "pitch", "roll")
+
+    def __init__(self, length: float, width: float):
+        self.length = length
+        self.width = width
+
+    def forward(self, real: Positions) -> Arrays:
+        upstream = np.asarray(real["upstream"])
+        down_in = np.asarray(real["downstream_in"])
+        down_out = np.asarray(real["downstream_out"])
+        downstream = (down_in + down_out) / 2
+        return dict(
+            height=(upstream + downstream) / 2,
+            pitch=np.arctan((downstream - upstream) / self.length),
+            roll=np.arctan((down_out - down_in) / self.width),
+        )
+
+    def inverse(self, pseudo: Positions) -> Arrays:
+        height = np.asarray(pseudo["height"])
+        rise = self.length * np.tan(pseudo["pitch"])
+        tilt = self.width * np.tan(pseudo["roll"])
+        downstream = height + rise / 2
+        return dict(
+            upstream=height - rise / 2,
+            downstream_in=downstream - tilt / 2,
+            downstream_out=downstream + tilt / 2,
+        )
@@ -0,0 +1,13 @@
+from typing import Dict
+
+from ophyd.v2.core import named
+
+from ..motor.devices import Motor
+from . import devices
+
+
+def trajectory_scan(
+    motors: Dict[str, Motor], name="", chunk_size: int = 1000
+) -> devices.TrajectoryScan:
+    """Continuous motion of motors through a scanspec Spec, keyed by axis"""
+    return named(devices.TrajectoryScan(motors, chunk_size), name)
@@ -0,0 +1,217 @@
+import asyncio
+from typing import Any, Dict, Iterator, List, Optional
+
+import numpy as np
+from bluesky.protocols import Descriptor, Flyable, PartialEvent, Reading, Stoppable
+from scanspec.specs import Spec
+
+from ophyd.v2.buffer import ReadingBuffer
+from ophyd.v2.core import AsyncStatus, Device, Monitor, register_move
+from ophyd.v2.tracing import span
+
+from ..motor.devices import Motor
+from .profile import Profile, compute_profile
+
+
+class TrajectoryScan(Device, Flyable, Stoppable):
+    """Fly Motors through the frames of a scanspec Spec as one continuous
+    motion, capturing their readbacks as arrays.
+
+    The Profile is computed up front, then streamed in chunks of chunk_size
+    points. The motor record has no PVT buffer, so each segment is sent as a
+    velocity and demand put at the time the previous point is reached"""
+
+    def __init__(self, motors: Dict[str, Motor], chunk_size: int = 1000):
+        assert chunk_size > 0, f"Chunk size {chunk_size} must be positive"
+        self.motors = motors
+        self.chunk_size = chunk_size
+        self.profile: Optional[Profile] = None
+        self._spec: Optional[Spec] = None
+        self._frame_time: Optional[float] = None
+        self._velocities: Dict[str, float] = {}
+        self._stream_status: Optional[AsyncStatus] = None
+        self._stopped = False
+        self._monitors: List[Monitor] = []
+        self._latest: Dict[str, Reading] = {}
+        self._buffers = {axis: ReadingBuffer() for axis in motors}
+
+    def set_spec(self, spec: Spec, frame_time: Optional[float] = None):
+        """Set the Spec that kickoff() will fly through, with frame_time for
+        Specs without frame durations"""
+        unknown = set(spec.axes()) - set(self.motors)
+        assert not unknown, f"{self.name} has no motors for axes {sorted(unknown)}"
+        self._spec = spec
+        self._frame_time = frame_time
+
+    async def _get_all(self, signal: str) -> Dict[str, float]:
+        axes = list(self.motors)
+        values = await asyncio.gather(
+            *[getattr(self.motors[axis].comm, signal).get_value() for axis in axes]
+        )
+        return dict(zip(axes, values))
+
+    async def prepare_profile(self) -> Profile:
+        """Compute the Profile from the Spec and the motor velocities and
+        acceleration times"""
+        assert self._spec, "set_spec() not called"
+        self._velocities = await self._get_all("velocity")
+        acceleration_times = await self._get_all("acceleration_time")
+        max_velocities = await self._get_all("max_velocity")
+        self.profile = compute_profile(
+            self._spec,
+            self._velocities,
+            acceleration_times,
+            self._frame_time,
+            max_velocities=max_velocities,
+        )
+        return self.profile
+
+    def _readback_changed(self, axis: str, reading: Reading):
+        # Each update adds a row with the latest readbacks of all axes, so the
+        # arrays stay aligned
+        self._latest[axis] = reading
+        if len(self._latest) == len(self.motors):
+            for name, latest in self._latest.items():
+                self._buffers[name].append(latest["value"], reading["timestamp"])
+
+    def _start_capture(self):
+        self._latest = {}
+        for axis, buffer in self._buffers.items():
+            buffer.clear()
+            self._monitors.append(
+                self.motors[axis].comm.readback.monitor_reading(
+                    lambda reading, axis=axis: self._readback_changed(axis, reading)
+                )
+            )
+
+    def _stop_capture(self):
+        for monitor in self._monitors:
+            monitor.close()
+        self._monitors = []
+
+    async def _send_segment(self, axis: str, velocity: float, position: float):
+        # Velocity must arrive first, as the demand starts the move
+        comm = self.motors[axis].comm
+        await comm.velocity.put(velocity, wait=False)
+        await comm.demand.put(position, wait=False)
+
+    async def _stream(self, profile: Profile):
+        try:
+            await self._send_segments(profile)
+        finally:
+            # Even if stopped, so the motors aren't left at a segment velocity
+            await self._restore_velocities()
+
+    async def _send_segments(self, profile: Profile):
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        prev_time = profile.times[0]
+        prev_positions = {axis: v[0] for axis, v in profile.positions.items()}
+        for chunk in profile.chunks(self.chunk_size):
+            with span("TrajectoryScan.chunk", device=self.name, points=len(chunk)):
+                # Segment velocities for the whole chunk at once, skipping
+                # segments where an axis doesn't move
+                dt = np.diff(chunk.times, prepend=prev_time)
+                segments = {}
+                for axis, positions in chunk.positions.items():
+                    distance = np.abs(np.diff(positions, prepend=prev_positions[axis]))
+                    velocity = np.divide(
+                        distance, dt, out=np.zeros(len(dt)), where=dt > 0
+                    )
+                    segments[axis] = (positions, velocity, distance > 0)
+                for i in range(len(chunk)):
+                    # Send segment i when the point before it is reached
+                    wait = start + (chunk.times[i] - dt[i]) - loop.time()
+                    if wait > 0:
+                        await asyncio.sleep(wait)
+                    await asyncio.gather(
+                        *[
+                            self._send_segment(
+                                axis, float(velocity[i]), float(positions[i])
+                            )
+                            for axis, (positions, velocity, moves) in segments.items()
+                            if moves[i]
+                        ]
+                    )
+                prev_time = chunk.times[-1]
+                prev_positions = {a: v[-1] for a, v in chunk.positions.items()}
+        # Wait for the last segment to finish
+        wait = start + profile.times[-1] - loop.time()
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    async def _restore_velocities(self):
+        await asyncio.gather(
+            *[
+                self.motors[axis].comm.velocity.put(velocity)
+                for axis, velocity in self._velocities.items()
+            ]
+        )
+
+    def kickoff(self) -> AsyncStatus:
+        async def do_kickoff():
+            self._stopped = False
+            profile = await self.prepare_profile()
+            with span("TrajectoryScan.move_to_start", device=self.name):
+                await asyncio.gather(
+                    *[
+                        self.motors[axis].set(float(positions[0]))
+                        for axis, positions in profile.positions.items()
+                    ]
+                )
+            self._start_capture()
+            # Registered so stop_all() stops the streaming of demands
+            self._stream_status = register_move(
+                AsyncStatus(self._stream(profile)), self
+            )
+
+        return register_move(AsyncStatus(do_kickoff()), self)
+
+    def complete(self) -> AsyncStatus:
+        async def do_complete():
+            assert self._stream_status, "kickoff() not called"
+            try:
+                await self._stream_status
+            except asyncio.CancelledError:
+                if self._stopped:
+                    raise RuntimeError("TrajectoryScan was stopped")
+                raise
+            finally:
+                self._stop_capture()
+
+        return AsyncStatus(do_complete())
+
+    async def stop(self, success=False) -> None:
+        self._stopped = True
+        if self._stream_status:
+            self._stream_status.task.cancel()
+        await asyncio.gather(*[m.stop(success) for m in self.motors.values()])
+
+    async def describe_collect(self) -> Dict[str, Dict[str, Descriptor]]:
+        descriptors: Dict[str, Descriptor] = {}
+        for motor_descriptors in await asyncio.gather(
+            *[m.describe() for m in self.motors.values()]
+        ):
+            descriptors.update(motor_descriptors)
+        return {self.name: descriptors}
+
+    def collect_pages(self) -> Iterator[Dict[str, Any]]:
+        """Yield the captured readbacks of all motors as a single event page"""
+        keys = {axis: f"{m.name}-readback" for axis, m in self.motors.items()}
+        timestamps = next(iter(self._buffers.values())).timestamps.copy()
+        yield dict(
+            time=timestamps,
+            data={keys[a]: b.values.copy() for a, b in self._buffers.items()},
+            timestamps={keys[a]: timestamps for a in self._buffers},
+        )
+        for buffer in self._buffers.values():
+            buffer.clear()
+
+    def collect(self) -> Iterator[PartialEvent]:
+        for page in self.collect_pages():
+            for i, t in enumerate(page["time"]):
+                yield dict(
+                    time=float(t),
+                    data={k: v[i].item() for k, v in page["data"].items()},
+                    timestamps={k: float(v[i]) for k, v in page["timestamps"].items()},
+                )
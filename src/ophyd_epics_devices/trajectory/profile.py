@@ -0,0 +1,142 @@
+from dataclasses import dataclass
+from typing import Dict, Iterator, Optional
+
+import numpy as np
+from scanspec.specs import Spec
+
+
+@dataclass
+class Profile:
+    """Position-velocity-time points for all axes of a trajectory"""
+
+    #: Seconds from the start of the trajectory to reach each point
+    times: np.ndarray
+    #: Position of each axis at each point
+    positions: Dict[str, np.ndarray]
+    #: Velocity of each axis at each point
+    velocities: Dict[str, np.ndarray]
+
+    def __len__(self) -> int:
+        return len(self.times)
+
+    def chunks(self, size: int) -> Iterator["Profile"]:
+        """Consecutive chunks of at most size points"""
+        for i in range(0, len(self), size):
+            yield Profile(
+                self.times[i : i + size],
+                {k: v[i : i + size] for k, v in self.positions.items()},
+                {k: v[i : i + size] for k, v in self.velocities.items()},
+            )
+
+
+def _ratio(numerator: np.ndarray, denominator) -> np.ndarray:
+    # Zero velocity or acceleration time means the motor record doesn't limit
+    # it, so treat as instantaneous
+    denominator = np.broadcast_to(denominator, np.shape(numerator))
+    return np.divide(
+        numerator,
+        denominator,
+        out=np.zeros(np.shape(numerator)),
+        where=denominator != 0,
+    )
+
+
+def compute_profile(
+    spec: Spec,
+    velocities: Dict[str, float],
+    acceleration_times: Dict[str, float],
+    frame_time: Optional[float] = None,
+    min_turnaround: float = 0.0,
+    max_velocities: Optional[Dict[str, float]] = None,
+) -> Profile:
+    """Compute a Profile that moves through the frames of spec at constant
+    velocity within each frame, starting and ending at rest.
+
+    The lower bound and midpoint of each frame are points, as is the upper bound
+    of a frame followed by a gap. Turnarounds across gaps, and the run-up and
+    ramp-down, take as long as the slowest axis needs to change speed at the
+    acceleration given by velocities and acceleration_times, and travel at
+    velocities. Frames take their duration from spec, or frame_time if it has
+    none. Raises ValueError if any segment between points needs an axis to go
+    faster than its max_velocities entry"""
+    frames = spec.frames()
+    axes = list(frames.midpoints)
+    n = len(frames)
+    duration = getattr(frames, "duration", None)
+    if duration is None:
+        assert frame_time, "Spec has no frame durations, so frame_time is needed"
+        duration = np.full(n, frame_time)
+    duration = np.asarray(duration, dtype=float)
+    gap = np.array(frames.gap, dtype=bool)
+    gap[0] = True
+    lower = {a: np.asarray(frames.lower[a], dtype=float) for a in axes}
+    mid = {a: np.asarray(frames.midpoints[a], dtype=float) for a in axes}
+    upper = {a: np.asarray(frames.upper[a], dtype=float) for a in axes}
+    velo = np.array([velocities[a] for a in axes])[:, None]
+    accl = np.array([acceleration_times[a] for a in axes])[:, None]
+
+    # Velocity within each frame, and at each lower bound where frames join
+    secant = np.array([(upper[a] - lower[a]) / duration for a in axes])
+    v_lower = secant.copy()
+    v_lower[:, 1:][:, ~gap[1:]] = (secant[:, :-1] + secant[:, 1:])[:, ~gap[1:]] / 2
+    v_upper = secant
+
+    # Time to stop from v0, travel distance, and start again at v1
+    def change_time(v0: np.ndarray, v1: np.ndarray, distance: np.ndarray):
+        accelerate = _ratio((np.abs(v0) + np.abs(v1)) * accl, velo)
+        return (accelerate + _ratio(np.abs(distance), velo)).max(axis=0)
+
+    lower_arr = np.array([lower[a] for a in axes])
+    upper_arr = np.array([upper[a] for a in axes])
+    turnaround = np.zeros(n)
+    turnaround[1:] = change_time(
+        v_upper[:, :-1], v_lower[:, 1:], lower_arr[:, 1:] - upper_arr[:, :-1]
+    )
+    turnaround[1:] = np.where(gap[1:], np.maximum(turnaround[1:], min_turnaround), 0)
+    zeros = np.zeros((len(axes), 1))
+    run_up = float(change_time(zeros, v_lower[:, :1], zeros[:, 0:1])[0])
+    ramp_down = float(change_time(v_upper[:, -1:], zeros, zeros)[0])
+
+    # Frame start times, then the three possible points of each frame
+    starts = (
+        run_up + np.cumsum(np.concatenate([[0], duration[:-1]])) + np.cumsum(turnaround)
+    )
+    slot_times = np.stack([starts - turnaround, starts, starts + duration / 2], axis=1)
+    slot_valid = np.ones((n, 3), dtype=bool)
+    slot_valid[:, 0] = gap
+    slot_valid[0, 0] = False
+    times = [np.array([0.0]), slot_times[slot_valid], starts[-1:] + duration[-1:]]
+    times.append(times[-1] + ramp_down)
+    positions: Dict[str, np.ndarray] = {}
+    velocities_out: Dict[str, np.ndarray] = {}
+    for i, a in enumerate(axes):
+        prev_upper = np.concatenate([[np.nan], upper[a][:-1]])
+        prev_v = np.concatenate([[np.nan], v_upper[i, :-1]])
+        slot_pos = np.stack([prev_upper, lower[a], mid[a]], axis=1)[slot_valid]
+        slot_vel = np.stack([prev_v, v_lower[i], secant[i]], axis=1)[slot_valid]
+        positions[a] = np.concatenate(
+            [
+                lower[a][:1] - v_lower[i, :1] * run_up / 2,
+                slot_pos,
+                upper[a][-1:],
+                upper[a][-1:] + v_upper[i, -1:] * ramp_down / 2,
+            ]
+        )
+        velocities_out[a] = np.concatenate([[0.0], slot_vel, v_upper[i, -1:], [0.0]])
+    profile = Profile(np.concatenate(times), positions, velocities_out)
+    if max_velocities:
+        _check_max_velocities(profile, max_velocities)
+    return profile
+
+
+def _check_max_velocities(profile: Profile, max_velocities: Dict[str, float]):
+    dt = np.diff(profile.times)
+    for axis, positions in profile.positions.items():
+        max_velocity = max_velocities[axis]
+        needed = _ratio(np.abs(np.diff(positions)), dt).max(initial=0)
+        # The motor record doesn't limit velocity if max_velocity is 0
+        if max_velocity and needed > max_velocity * (1 + 1e-9):
+            raise ValueError(
+                f"Axis {axis} needs velocity {needed:.4g}, which is more than "
+                f"its max velocity {max_velocity}"
+            )
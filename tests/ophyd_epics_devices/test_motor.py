@@ -1,11 +1,18 @@
 import asyncio
+import time
 from typing import Dict, cast
 from unittest.mock import Mock, call
 
 import pytest
 from bluesky.protocols import Reading
 
-from ophyd.v2.core import CommsConnector, NamedDevices, SignalDevice
+from ophyd.v2.core import (
+    CommsConnector,
+    NamedDevices,
+    SignalDevice,
+    _moving,
+    stop_all,
+)
 from ophyd.v2.pvsim import PvSim
 from ophyd_epics_devices import motor
 
@@ -112,3 +119,218 @@ async def test_set_velocity(sim_motor: motor.devices.Motor) -> None:
     await v.set(3.0)
     assert (await v.read())["sim_motor-velocity"]["value"] == 3.0
     assert q.empty()
+
+
+async def test_motor_fly(sim_motor: motor.devices.Motor) -> None:
+    demand = cast(PvSim, sim_motor.comm.demand.write_pv)
+    demand.put_proceeds.clear()
+    readback = cast(PvSim, sim_motor.comm.readback.read_pv)
+    sim_motor.set_fly_target(0.3)
+    await sim_motor.kickoff()
+    await asyncio.sleep(A_BIT)
+    assert demand.value == 0.3
+    complete = sim_motor.complete()
+    for position in (0.1, 0.2, 0.3):
+        readback.set_value(position)
+    assert not complete.done
+    demand.put_proceeds.set()
+    await complete
+    assert (await sim_motor.describe_collect())["sim_motor"]["sim_motor-readback"][
+        "source"
+    ] == "sim://BLxxI-MO-TABLE-01:X.RBV"
+    events = list(sim_motor.collect())
+    assert [e["data"]["sim_motor-readback"] for e in events] == [0.0, 0.1, 0.2, 0.3]
+    assert events[1]["timestamps"]["sim_motor-readback"] == events[1]["time"]
+    # Buffer is emptied by collect, and no longer monitored
+    readback.set_value(0.4)
+    assert list(sim_motor.collect()) == []
+
+
+async def test_motor_shares_readback_monitor(sim_motor: motor.devices.Motor) -> None:
+    demand = cast(PvSim, sim_motor.comm.demand.write_pv)
+    readback = cast(PvSim, sim_motor.comm.readback.read_pv)
+    sim_motor.stage()
+    cache = sim_motor.comm.readback._cache
+    assert cache and len(cache.value_listeners) == 1
+    for position in (0.1, 0.2):
+        demand.put_proceeds.clear()
+        s = sim_motor.set(position)
+        watcher = Mock()
+        s.watch(watcher)
+        await asyncio.sleep(A_BIT)
+        readback.set_value(position)
+        demand.put_proceeds.set()
+        await s
+        assert watcher.call_args[1]["current"] == position
+        # Moves attach to the motor's monitor rather than making their own
+        assert len(cache.value_listeners) == 1
+        assert len(readback._listeners) == 1
+    sim_motor.unstage()
+    assert not cache.value_listeners
+    assert cache.monitor is None
+    # Unmatched unstage doesn't stop the next stage holding the monitor
+    sim_motor.unstage()
+    sim_motor.stage()
+    assert sim_motor._readback_monitor and len(cache.value_listeners) == 1
+    sim_motor.unstage()
+    assert sim_motor._readback_monitor is None
+
+
+async def test_motor_done_move_completion(sim_motor: motor.devices.Motor) -> None:
+    sim_motor.completion = motor.devices.DoneMoveCompletion()
+    demand = cast(PvSim, sim_motor.comm.demand.write_pv)
+    # Put callback never comes, so we must be using DMOV
+    demand.put_proceeds.clear()
+    done_move = cast(PvSim, sim_motor.comm.done_move.read_pv)
+    done_move.set_value(True)
+    s = sim_motor.set(0.5)
+    await asyncio.sleep(A_BIT)
+    assert demand.value == 0.5
+    done_move.set_value(False)
+    await asyncio.sleep(A_BIT)
+    assert not s.done
+    done_move.set_value(True)
+    await asyncio.sleep(A_BIT)
+    assert s.done and s.success
+
+
+async def test_motor_done_move_completion_already_moving(
+    sim_motor: motor.devices.Motor,
+) -> None:
+    sim_motor.completion = motor.devices.DoneMoveCompletion()
+    demand = cast(PvSim, sim_motor.comm.demand.write_pv)
+    demand.put_proceeds.clear()
+    done_move = cast(PvSim, sim_motor.comm.done_move.read_pv)
+    # Retargeting a moving motor means done_move only rises
+    done_move.set_value(False)
+    s = sim_motor.set(0.5)
+    await asyncio.sleep(A_BIT)
+    assert not s.done
+    done_move.set_value(True)
+    await asyncio.sleep(A_BIT)
+    assert s.done and s.success
+
+
+async def test_motor_done_move_completion_without_transition(
+    sim_motor: motor.devices.Motor,
+) -> None:
+    sim_motor.completion = motor.devices.DoneMoveCompletion()
+    demand = cast(PvSim, sim_motor.comm.demand.write_pv)
+    done_move = cast(PvSim, sim_motor.comm.done_move.read_pv)
+    done_move.set_value(True)
+    # A no-op move whose 0 was never seen finishes on the put callback
+    await asyncio.wait_for(sim_motor.set(0.0), timeout=0.1)
+    # And with no put callback, stopping finishes it
+    demand.put_proceeds.clear()
+    s = sim_motor.set(0.0)
+    await asyncio.sleep(A_BIT)
+    assert not s.done
+    await sim_motor.stop()
+    await asyncio.sleep(A_BIT)
+    assert s.done and not s.success
+
+
+async def test_motor_tolerance_completion(sim_motor: motor.devices.Motor) -> None:
+    sim_motor.completion = motor.devices.ToleranceCompletion(0.01, settle_time=0.05)
+    demand = cast(PvSim, sim_motor.comm.demand.write_pv)
+    demand.put_proceeds.clear()
+    readback = cast(PvSim, sim_motor.comm.readback.read_pv)
+    s = sim_motor.set(0.5)
+    await asyncio.sleep(A_BIT)
+    readback.set_value(0.495)
+    await asyncio.sleep(0.03)
+    # Overshoot out of tolerance restarts the settle time
+    readback.set_value(0.52)
+    await asyncio.sleep(0.03)
+    readback.set_value(0.505)
+    await asyncio.sleep(0.03)
+    assert not s.done
+    await asyncio.sleep(0.05)
+    assert s.done and s.success
+
+
+async def test_motor_tolerance_completion_stopped(
+    sim_motor: motor.devices.Motor,
+) -> None:
+    sim_motor.completion = motor.devices.ToleranceCompletion(0.01)
+    s = sim_motor.set(0.5)
+    await asyncio.sleep(A_BIT)
+    await sim_motor.stop()
+    await asyncio.sleep(A_BIT)
+    assert s.done
+    assert s.success is False
+
+
+async def test_stop_all_benchmark() -> None:
+    async with CommsConnector(sim_mode=True):
+        motors = [motor.motor(f"BLxxI-MO-SIM-01:M{i}", f"m{i}") for i in range(300)]
+    demands = [cast(PvSim, m.comm.demand.write_pv) for m in motors]
+    stops = [cast(PvSim, m.comm.stop.write_pv) for m in motors]
+    for demand in demands:
+        demand.put_proceeds.clear()
+    statuses = [m.set(1.0) for m in motors]
+    await asyncio.sleep(A_BIT)
+    assert len(_moving) == 300
+    start = time.monotonic()
+    tasks = stop_all()
+    # Every STOP put is sent in the very next tick
+    await asyncio.sleep(0)
+    latency = time.monotonic() - start
+    assert all(stop.value == 1 for stop in stops)
+    assert all(t.done() for t in tasks)
+    assert latency < 0.1
+    for demand in demands:
+        demand.put_proceeds.set()
+    await asyncio.gather(*statuses, return_exceptions=True)
+    assert not any(s.success for s in statuses)
+    assert not _moving
+
+
+async def test_motor_rejects_move_outside_limits(
+    sim_motor: motor.devices.Motor,
+) -> None:
+    demand = cast(PvSim, sim_motor.comm.demand.write_pv)
+    cast(PvSim, sim_motor.comm.low_limit.read_pv).set_value(-1.0)
+    cast(PvSim, sim_motor.comm.high_limit.read_pv).set_value(1.0)
+    await sim_motor.set(0.9)
+    assert demand.value == 0.9
+    with pytest.raises(ValueError) as cm:
+        await sim_motor.set(1.1)
+    assert str(cm.value) == "sim_motor target 1.1 outside limits [-1.0, 1.0]"
+    assert demand.value == 0.9
+    # Limit changes come through the monitor
+    cast(PvSim, sim_motor.comm.high_limit.read_pv).set_value(2.0)
+    await sim_motor.set(1.1)
+    assert demand.value == 1.1
+
+
+async def test_motor_configure_only_puts_changes(
+    sim_motor: motor.devices.Motor,
+) -> None:
+    velocity = cast(PvSim, sim_motor.comm.velocity.write_pv)
+    sim_motor.stage()
+    old_timestamp = velocity.timestamp
+    assert await sim_motor.configure_changed({"velocity": 1.0}) == []
+    assert velocity.timestamp == old_timestamp
+    assert await sim_motor.configure_changed({"velocity": 2.5}) == ["velocity"]
+    assert velocity.value == 2.5
+    sim_motor.unstage()
+    with pytest.raises(AssertionError) as cm:
+        await sim_motor.configure_changed({"egu": "um"})
+    assert str(cm.value) == "Signal egu not writeable"
+
+
+async def test_stop_all_from_another_thread(sim_motor: motor.devices.Motor) -> None:
+    demand = cast(PvSim, sim_motor.comm.demand.write_pv)
+    stop = cast(PvSim, sim_motor.comm.stop.write_pv)
+    demand.put_proceeds.clear()
+    s = sim_motor.set(1.0)
+    await asyncio.sleep(A_BIT)
+    # Like an abort from the IPython thread while the loop runs in another
+    [future] = await asyncio.get_running_loop().run_in_executor(None, stop_all)
+    await asyncio.wrap_future(future)
+    assert stop.value == 1
+    demand.put_proceeds.set()
+    with pytest.raises(RuntimeError, match="Motor was stopped"):
+        await s
+    assert not _moving
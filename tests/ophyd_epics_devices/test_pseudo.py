@@ -0,0 +1,98 @@
+import asyncio
+from typing import List, cast
+
+import numpy as np
+import pytest
+
+from ophyd.v2.core import CommsConnector, _moving
+from ophyd.v2.pvsim import PvSim
+from ophyd_epics_devices import motor, pseudo
+from ophyd_epics_devices.motor.devices import Motor
+from ophyd_epics_devices.pseudo.transforms import TableTransform
+
+
+def sim_readback(m: Motor) -> PvSim:
+    return cast(PvSim, m.comm.readback.read_pv)
+
+
+def sim_demand(m: Motor) -> PvSim:
+    return cast(PvSim, m.comm.demand.write_pv)
+
+
+@pytest.fixture
+async def sim_slits():
+    async with CommsConnector(sim_mode=True):
+        positive = motor.motor("BLxxI-AL-SLITS-01:POS", name="s1pos")
+        negative = motor.motor("BLxxI-AL-SLITS-01:NEG", name="s1neg")
+    sim_demand(positive).set_value(1.0)
+    sim_demand(negative).set_value(-0.5)
+    yield await pseudo.slits(positive, negative, name="s1")
+
+
+async def test_slits_vectorised_transforms(sim_slits: pseudo.devices.Slits):
+    real = sim_slits.inverse(dict(gap=np.linspace(1, 2, 1000), centre=0.5))
+    assert real["positive"].shape == (1000,)
+    assert real["positive"][-1] == 1.5 and real["negative"][-1] == -0.5
+    assert sim_slits.forward(real)["gap"] == pytest.approx(np.linspace(1, 2, 1000))
+
+
+async def test_slits_move_gap_holds_centre(sim_slits: pseudo.devices.Slits):
+    positive, negative = sim_slits.real["positive"], sim_slits.real["negative"]
+    # Demands are 1.0 and -0.5, so centre is 0.25
+    await sim_slits.gap.set(3.0)
+    assert sim_demand(positive).value == 1.75
+    assert sim_demand(negative).value == -1.25
+    await sim_slits.set(dict(centre=0.0))
+    assert sim_demand(positive).value == 1.5
+    assert sim_demand(negative).value == -1.5
+    with pytest.raises(AssertionError, match="no pseudo axes"):
+        sim_slits.set(dict(height=1.0))
+
+
+async def test_slits_readbacks_update_incrementally(
+    sim_slits: pseudo.devices.Slits,
+):
+    positive, negative = sim_slits.real["positive"], sim_slits.real["negative"]
+    sim_readback(positive).set_value(1.0)
+    sim_readback(negative).set_value(-1.0)
+    gaps: List[float] = []
+    m = sim_slits.gap.readback.monitor_value(gaps.append)
+    sim_readback(positive).set_value(1.5)
+    sim_readback(negative).set_value(-0.5)
+    assert gaps == [2.0, 2.5, 2.0]
+    m.close()
+    assert sim_slits.gap.name == "s1-gap"
+    readings = await sim_slits.read()
+    assert readings["s1-gap-readback"]["value"] == 2.0
+    assert readings["s1-centre-readback"]["value"] == 0.5
+    assert (await sim_slits.describe())["s1-gap-readback"]["dtype"] == "number"
+
+
+async def test_table_transform_round_trip():
+    transform = TableTransform(length=2.0, width=1.0)
+    pseudo_positions = dict(
+        height=np.array([0.0, 1.0, 2.0]), pitch=0.01, roll=np.array([0, -0.02, 0.02])
+    )
+    real = transform.inverse(pseudo_positions)
+    assert real["upstream"][0] == pytest.approx(-np.tan(0.01))
+    back = transform.forward(real)
+    for axis, expected in pseudo_positions.items():
+        assert back[axis] == pytest.approx(np.broadcast_to(expected, (3,)))
+
+
+async def test_table_moves_all_jacks_concurrently():
+    async with CommsConnector(sim_mode=True):
+        jacks = [motor.motor(f"BLxxI-MO-TABLE-01:Y{i}") for i in range(3)]
+    table = await pseudo.table(*jacks, length=2.0, width=1.0, name="t1")
+    for jack in jacks:
+        sim_demand(jack).put_proceeds.clear()
+    status = table.height.set(1.0)
+    await asyncio.sleep(0.01)
+    # All the real moves are in flight at once
+    assert [sim_demand(jack).value for jack in jacks] == [1.0, 1.0, 1.0]
+    assert not status.done
+    # Only the real motors are registered, so stop_all stops each of them once
+    assert sorted(_moving.values(), key=jacks.index) == jacks
+    for jack in jacks:
+        sim_demand(jack).put_proceeds.set()
+    await status
@@ -0,0 +1,130 @@
+import asyncio
+from typing import Dict, List, cast
+
+import numpy as np
+import pytest
+from scanspec.specs import ConstantDuration, Fly, Line, Spiral
+
+from ophyd.v2.core import CommsConnector, _moving, stop_all
+from ophyd.v2.pvsim import PvSim
+from ophyd_epics_devices import motor, trajectory
+from ophyd_epics_devices.motor.devices import Motor
+from ophyd_epics_devices.trajectory.profile import compute_profile
+
+
+def sim_pv(signal) -> PvSim:
+    return cast(PvSim, getattr(signal, "write_pv", None) or signal.read_pv)
+
+
+def test_grid_profile_has_turnarounds_at_gaps():
+    spec = Fly(ConstantDuration(0.1, Line("y", 0, 1, 2) * ~Line("x", 0, 2, 3)))
+    profile = compute_profile(spec, dict(x=10, y=10), dict(x=0.1, y=0.1))
+    # Run-up, 3 frames of lower and mid, turnaround, 3 frames, end, ramp-down
+    assert len(profile) == 16
+    assert profile.positions["x"][[0, 1, 7, 8, 15]] == pytest.approx(
+        [-1, -0.5, 2.5, 2.5, -1]
+    )
+    assert profile.velocities["x"][[0, 1, 7, 8, 15]] == pytest.approx(
+        [0, 10, 10, -10, 0]
+    )
+    # Reversing at 100 units/s^2 takes 0.2s, and y moves during it
+    assert profile.times[8] - profile.times[7] == pytest.approx(0.2)
+    assert profile.positions["y"][[7, 8]] == pytest.approx([0, 1])
+    assert profile.times[-1] == pytest.approx(1.0)
+    assert [len(c) for c in profile.chunks(6)] == [6, 6, 4]
+    # Frames need x at 10 units/s
+    with pytest.raises(ValueError, match="Axis x needs velocity 10"):
+        compute_profile(
+            spec, dict(x=10, y=10), dict(x=0.1, y=0.1), max_velocities=dict(x=5, y=0)
+        )
+
+
+def test_spiral_profile_is_continuous():
+    spec = Fly(Spiral("x", 0, 10, 1, "y", 0, 10))
+    profile = compute_profile(spec, dict(x=5, y=5), dict(x=0.2, y=0.2), 0.01)
+    n = len(spec.frames())
+    # No gaps, so just the run-up, lower and mid of each frame, end, ramp-down
+    assert len(profile) == 2 * n + 3
+    assert np.all(np.diff(profile.times) > 0)
+    assert profile.times[-2] - profile.times[1] == pytest.approx(n * 0.01)
+    with pytest.raises(AssertionError, match="frame_time is needed"):
+        compute_profile(spec, dict(x=5, y=5), dict(x=0.2, y=0.2))
+
+
+@pytest.fixture
+async def sim_motors():
+    async with CommsConnector(sim_mode=True):
+        x = motor.motor("BLxxI-MO-STAGE-01:X", name="x")
+        y = motor.motor("BLxxI-MO-STAGE-01:Y", name="y")
+    for m in (x, y):
+        sim_pv(m.comm.velocity).set_value(10.0)
+        sim_pv(m.comm.max_velocity).set_value(100.0)
+        sim_pv(m.comm.acceleration_time).set_value(0.01)
+        # Readback follows the demand instantly
+        sim_pv(m.comm.demand).monitor_reading_value(
+            lambda reading, value, m=m: sim_pv(m.comm.readback).set_value(value)
+        )
+    yield dict(x=x, y=y)
+
+
+async def test_trajectory_scan_streams_chunks(sim_motors: Dict[str, Motor]):
+    scan = trajectory.trajectory_scan(sim_motors, name="traj", chunk_size=4)
+    x: Motor = sim_motors["x"]
+    velocities: List[float] = []
+    puts: List[str] = []
+
+    def velocity_put(reading, value: float):
+        velocities.append(value)
+        puts.append("VELO")
+
+    sim_pv(x.comm.velocity).monitor_reading_value(velocity_put)
+    sim_pv(x.comm.demand).monitor_reading_value(
+        lambda reading, value: puts.append("VAL")
+    )
+    spec = Fly(ConstantDuration(0.01, Line("y", 0, 1, 2) * ~Line("x", 0, 1, 3)))
+    scan.set_spec(spec)
+    await scan.kickoff()
+    assert scan.profile
+    await scan.complete()
+    # Every point of x was demanded, ending at rest, with velocity restored
+    assert sim_pv(x.comm.demand).value == scan.profile.positions["x"][-1]
+    assert velocities[-1] == 10.0
+    assert max(velocities) == pytest.approx(50.0)
+    # Initial values, move to start, segments each VELO then VAL, restore
+    segments = puts[3:-1]
+    assert puts[:3] == ["VELO", "VAL", "VAL"] and puts[-1] == "VELO"
+    assert segments == ["VELO", "VAL"] * (len(segments) // 2)
+    assert set(await scan.describe_collect()) == {"traj"}
+    [page] = list(scan.collect_pages())
+    xs, ys = page["data"]["x-readback"], page["data"]["y-readback"]
+    assert len(xs) == len(ys) == len(page["time"]) > 10
+    assert xs[-1] == scan.profile.positions["x"][-1]
+    assert ys[-1] == 1
+    assert list(scan.collect()) == []
+    # Frames need x at 50 units/s
+    sim_pv(x.comm.max_velocity).set_value(20.0)
+    with pytest.raises(ValueError, match="more than its max velocity 20"):
+        await scan.kickoff()
+
+
+async def test_trajectory_scan_stop(sim_motors: Dict[str, Motor]):
+    scan = trajectory.trajectory_scan(sim_motors, name="traj")
+    with pytest.raises(AssertionError, match="no motors for axes"):
+        scan.set_spec(Fly(ConstantDuration(0.1, Line("z", 0, 1, 3))))
+    scan.set_spec(Fly(ConstantDuration(1.0, Line("x", 0, 1, 3))))
+    await scan.kickoff()
+    await asyncio.sleep(0.1)
+    assert set(_moving.values()) == {scan}
+    x = sim_motors["x"]
+    assert sim_pv(x.comm.velocity).value != 10.0
+    stop_all()
+    await asyncio.sleep(0.01)
+    # Velocity is restored without waiting for complete()
+    assert sim_pv(x.comm.velocity).value == 10.0
+    demand = sim_pv(x.comm.demand).value
+    with pytest.raises(RuntimeError, match="TrajectoryScan was stopped"):
+        await scan.complete()
+    # No more demands are sent after the stop
+    await asyncio.sleep(0.6)
+    assert sim_pv(x.comm.demand).value == demand
+    assert not _moving
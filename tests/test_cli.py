@@ -1,9 +1,28 @@
 import subprocess
 import sys
 
+import pytest
+
 from ophyd import __version__
+from ophyd.__main__ import main
 
 
 def test_cli_version():
     cmd = [sys.executable, "-m", "ophyd", "--version"]
     assert subprocess.check_output(cmd).decode().strip() == __version__
+
+
+def test_cli_monitor_help(capsys):
+    with pytest.raises(SystemExit) as exc_info:
+        main(["monitor", "--help"])
+    assert exc_info.value.code == 0
+    assert "--coalesce" in capsys.readouterr().out
+
+
+def test_cli_monitor_nothing_connected():
+    with pytest.raises(SystemExit) as exc_info:
+        main(["monitor", "--timeout", "0.1", "--interval", "0", "BAD:PV"])
+    # sys.exit with a message prints it to stderr and exits with 1
+    assert exc_info.value.code == (
+        "ophyd monitor: None of ['BAD:PV'] connected within 0.1s"
+    )
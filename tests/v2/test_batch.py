@@ -0,0 +1,41 @@
+from typing import cast
+
+import pytest
+from bluesky import RunEngine
+from bluesky.run_engine import call_in_bluesky_event_loop
+
+from ophyd.v2.batch import describe_many, get_values, put_many, read_many
+from ophyd.v2.core import SignalDevice
+from ophyd.v2.epics import EpicsSignalRO, EpicsSignalRW
+from ophyd.v2.pvsim import PvSim
+
+
+@pytest.fixture(scope="module")
+def RE():
+    RE = RunEngine(call_returns_result=True)
+    yield RE
+
+
+async def make_signals():
+    ro = EpicsSignalRO(PvSim, float)
+    rw = EpicsSignalRW(PvSim, float)
+    await ro.connect("batch:ro")
+    await rw.connect("batch:rw", "batch:rw")
+    return ro, rw
+
+
+def test_batched_sync_calls(RE):
+    ro, rw = call_in_bluesky_event_loop(make_signals())
+    cast(PvSim, ro.read_pv).set_value(1.5)
+    cast(PvSim, rw.read_pv).set_value(4.0)
+    dev = SignalDevice(rw, "dev")
+    errors = put_many(dict(rw=(rw, 3.0), ro=(ro, 2.0)))
+    assert errors["rw"] is None
+    assert cast(PvSim, rw.write_pv).reading["value"] == 3.0
+    assert isinstance(errors["ro"], AttributeError)
+    assert get_values(dict(ro=ro, dev=dev)) == dict(ro=1.5, dev=4.0)
+    readings = read_many(dict(ro=ro, dev=dev))
+    assert readings["ro"]["ro"]["value"] == 1.5
+    assert readings["dev"]["dev"]["value"] == 4.0
+    descriptions = describe_many(dict(ro=ro))
+    assert descriptions["ro"]["ro"]["source"] == "sim://batch:ro"
@@ -0,0 +1,16 @@
+import numpy as np
+
+from ophyd.v2.buffer import ReadingBuffer
+
+
+def test_reading_buffer_grows() -> None:
+    buffer = ReadingBuffer(capacity=2)
+    for i in range(5):
+        buffer.append_reading(dict(value=i * 0.5, timestamp=100.0 + i))
+    assert len(buffer) == 5
+    assert buffer.capacity == 8
+    assert np.array_equal(buffer.values, [0, 0.5, 1, 1.5, 2])
+    assert np.array_equal(buffer.timestamps, [100, 101, 102, 103, 104])
+    buffer.clear()
+    assert len(buffer) == 0
+    assert buffer.capacity == 8
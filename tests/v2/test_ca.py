@@ -6,11 +6,13 @@ import sys
 import time
 from enum import Enum
 from pathlib import Path
+from typing import List
 
 import pytest
 from aioca import purge_channel_caches
 
 from ophyd.v2.pvca import PvCa
+from ophyd.v2.pvstats import connect_pvs, monitor_signals
 
 RECORDS = str(Path(__file__).parent / "records.db")
 PV_PREFIX = "".join(random.choice(string.ascii_uppercase) for _ in range(12))
@@ -18,6 +20,7 @@ LONGOUT = PV_PREFIX + "longout"
 AO = PV_PREFIX + "ao"
 MBBO = PV_PREFIX + "mbbo"
 MBBI = PV_PREFIX + "mbbi"
+TICKER = PV_PREFIX + "ticker"
 
 
 # Use a module level fixture so it's fast to run tests. This means we need to
@@ -102,6 +105,29 @@ async def test_ca_signal_get_put_enum(ioc):
     assert (await pv.get_value()) == MyEnum.b
     await pv.put(MyEnum.c)
     assert (await pv.get_value()) == MyEnum.c
+    assert (await pv.get_descriptor()) == {
+        "source": f"ca://{MBBO}",
+        "dtype": "string",
+        "shape": [],
+    }
+
+
+class PartialEnum(Enum):
+    a = "Aaa"
+    c = "Ccc"
+
+
+async def test_ca_signal_enum_transferred_as_index(ioc):
+    pv = PvCa(MBBO, PartialEnum)
+    pv_int = PvCa(MBBO, int)
+    await asyncio.gather(pv.connect(), pv_int.connect())
+    assert pv.converter.choices == (PartialEnum.a, None, PartialEnum.c)
+    await pv.put(PartialEnum.a)
+    assert (await pv_int.get_value()) == 0
+    await pv_int.put(1)
+    with pytest.raises(ValueError) as cm:
+        await pv.get_value()
+    assert str(cm.value) == "Index 1 is not a valid PartialEnum"
 
 
 class BadEnum(Enum):
@@ -135,3 +161,31 @@ async def test_ca_enum_monitor_reading(ioc):
     assert v2[1] == MyEnum.c
 
     m.close()
+
+
+async def test_ca_get_readings_batched(ioc):
+    pvs = [PvCa(AO, float), PvCa(MBBI, MyEnum), PvCa(LONGOUT, int)]
+    await asyncio.gather(*[pv.connect() for pv in pvs])
+    readings = await PvCa.get_readings(pvs)
+    assert [r["value"] for r in readings] == [await pv.get_value() for pv in pvs]
+
+
+async def test_monitor_stats(ioc):
+    signals = await connect_pvs([TICKER])
+    assert list(signals) == [TICKER]
+    # PVs that don't connect are left out
+    assert await connect_pvs([PV_PREFIX + "nonexistent"], timeout=0.1) == {}
+    output: List[str] = []
+    stats = await monitor_signals(
+        signals, duration=0.55, interval=0.25, output=output.append
+    )
+    # 2 live displays then the summary
+    assert len(output) == 3
+    assert output[-1].startswith("Summary:\nPV")
+    assert TICKER in output[-1]
+    ticker = stats[TICKER]
+    # Initial value then one every 0.1s
+    assert 5 <= ticker.count <= 7
+    assert ticker.rate == pytest.approx(10, rel=0.3)
+    assert ticker.jitter < 0.05
+    assert 0 < ticker.latency < 0.05
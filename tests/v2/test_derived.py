@@ -0,0 +1,83 @@
+from typing import List, cast
+
+import numpy as np
+import pytest
+from bluesky.protocols import Reading
+
+from ophyd.v2.core import CompactReading
+from ophyd.v2.derived import DerivedPv, derived_signal
+from ophyd.v2.epics import EpicsSignalRO
+from ophyd.v2.pvsim import PvSim
+
+
+async def sim_input(name: str, datatype=float) -> EpicsSignalRO:
+    sig = EpicsSignalRO(PvSim, datatype)
+    await sig.connect(name)
+    return sig
+
+
+def sim_pv(sig: EpicsSignalRO) -> PvSim:
+    return cast(PvSim, sig.read_pv)
+
+
+async def test_derived_signal_recomputes_on_input_change():
+    top, bottom = await sim_input("top"), await sim_input("bottom")
+    sim_pv(top).set_value(5.0)
+    sim_pv(bottom).set_value(2.0)
+    gap = await derived_signal(
+        "gap", lambda top, bottom: top - bottom, float, top=top, bottom=bottom
+    )
+    assert gap.source == "derived://gap"
+    # Not monitored, so gets the inputs
+    assert await gap.get_value() == 3.0
+    assert await gap.get_descriptor() == dict(
+        source="derived://gap", dtype="number", shape=[]
+    )
+    derived = cast(DerivedPv, gap.read_pv)
+    derived.computations = 0
+    values: List[float] = []
+    m = gap.monitor_value(values.append)
+    # Only computed once for the initial values
+    assert values == [3.0] and derived.computations == 1
+    sim_pv(top).set_value(7.0)
+    sim_pv(bottom).set_value(1.0)
+    assert values == [3.0, 5.0, 6.0] and derived.computations == 3
+    # Monitored, so doesn't compute to get
+    reading = await gap.get_reading()
+    assert derived.computations == 3
+    # Timestamp is that of the newest input
+    assert reading["timestamp"] == (await bottom.get_reading())["timestamp"]
+    assert reading["timestamp"] >= (await top.get_reading())["timestamp"]
+    m.close()
+    # Stops monitoring the inputs
+    assert top._cache and not top._cache.monitor
+
+
+async def test_derived_severity_is_the_most_severe():
+    top, bottom = await sim_input("top_sevr"), await sim_input("bottom_sevr")
+    gap = await derived_signal(
+        "gap_sevr", lambda top, bottom: top - bottom, float, top=top, bottom=bottom
+    )
+    # CA gives INVALID as -1, which is worse than MAJOR and NO_ALARM
+    cases = [(-1, 0, -1), (2, -1, -1), (1, 0, 1)]
+    for top_sevr, bottom_sevr, expected in cases:
+        sim_pv(top).reading = cast(Reading, CompactReading(2.0, 1.0, top_sevr))
+        sim_pv(bottom).reading = cast(Reading, CompactReading(1.0, 1.0, bottom_sevr))
+        assert (await gap.get_reading())["alarm_severity"] == expected
+
+
+async def test_derived_signal_vectorised():
+    spectrum, background = await sim_input("spectrum", list), await sim_input("bg")
+    sim_pv(spectrum).set_value([3.0, 4.0, 5.0])
+    sim_pv(background).set_value(1.0)
+    corrected = await derived_signal(
+        "corrected",
+        lambda spectrum, bg: np.clip(spectrum - bg * 3.5, 0, None),
+        np.ndarray,
+        spectrum=spectrum,
+        bg=background,
+    )
+    assert (await corrected.get_value()).tolist() == [0.0, 0.5, 1.5]
+    assert (await corrected.get_descriptor())["shape"] == [3]
+    with pytest.raises(NotImplementedError):
+        await corrected.read_pv.put(np.zeros(3))
@@ -1,14 +1,33 @@
 import asyncio
-from typing import Callable, cast
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, cast
 from unittest.mock import Mock
 
+import numpy as np
 import pytest
 from bluesky.protocols import Descriptor, Reading
 
-from ophyd.v2.core import CommsConnector, Monitor, SignalCollection, T
-from ophyd.v2.epics import EpicsComm, EpicsSignalRO, EpicsSignalRW, epics_connector
+from ophyd.v2 import epics
+from ophyd.v2.core import (
+    CommsConnector,
+    CompactReading,
+    Monitor,
+    SignalCollection,
+    SignalTimeoutError,
+    T,
+)
+from ophyd.v2.epics import (
+    EpicsComm,
+    EpicsSignalRO,
+    EpicsSignalRW,
+    _fetched,
+    _fetching,
+    epics_connector,
+)
 from ophyd.v2.pv import Pv, uninstantiatable_pv
-from ophyd.v2.pvsim import SimMonitor
+from ophyd.v2.pvsim import PvSim, SimMonitor
 
 
 def test_uninstantiatable_pv():
@@ -130,3 +149,237 @@ async def test_signal_collection_cached_read() -> None:
     await sc.read()
     assert pv.reading.call_count == 1
     assert pv.monitored.call_count == 1
+
+
+def test_compact_reading_is_a_reading_mapping() -> None:
+    reading = CompactReading(3.5, 100.0, alarm_severity=0)
+    assert reading == {"value": 3.5, "timestamp": 100.0, "alarm_severity": 0}
+    assert reading["value"] == 3.5
+    assert dict(reading) == reading.to_dict()
+    # The dict is only made once
+    assert reading.to_dict() is reading.to_dict()
+    assert not hasattr(reading, "__dict__")
+    no_severity = CompactReading("s", 101.0)
+    assert list(no_severity) == ["value", "timestamp"]
+    assert len(no_severity) == 2
+    with pytest.raises(KeyError):
+        no_severity["alarm_severity"]
+    assert repr(no_severity) == "{'value': 's', 'timestamp': 101.0}"
+
+
+async def sim_signal(datatype=float) -> EpicsSignalRO:
+    sig = EpicsSignalRO(PvSim, datatype)
+    await sig.connect("sim_pv")
+    return sig
+
+
+async def test_off_loop_monitor_keeps_order() -> None:
+    sig = await sim_signal()
+    pv = cast(PvSim, sig.read_pv)
+    values: List[float] = []
+    threads = set()
+
+    def slow_callback(value: float):
+        time.sleep(0.01)
+        threads.add(threading.get_ident())
+        values.append(value)
+
+    with ThreadPoolExecutor() as executor:
+        m = sig.monitor_value(slow_callback, executor=executor)
+        start = time.monotonic()
+        for i in range(1, 6):
+            pv.set_value(float(i))
+        # The event loop wasn't held up by the slow callback
+        assert time.monotonic() - start < 0.04
+        while len(values) < 6:
+            await asyncio.sleep(0.01)
+        m.close()
+    assert values == [0.0, 1.0, 2.0, 3.0, 4.0, 5.0]
+    assert threads and threading.get_ident() not in threads
+
+
+async def test_off_loop_monitor_drops_oldest_when_full() -> None:
+    sig = await sim_signal()
+    pv = cast(PvSim, sig.read_pv)
+    proceed = threading.Event()
+    values: List[float] = []
+
+    def blocked_callback(value: float):
+        proceed.wait()
+        values.append(value)
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        m = sig.monitor_value(blocked_callback, executor=executor, queue_size=2)
+        await asyncio.sleep(0.01)
+        # Initial value is in progress, so these fill the queue then overflow
+        for i in range(1, 5):
+            pv.set_value(float(i))
+        proceed.set()
+    m.close()
+    assert values == [0.0, 3.0, 4.0]
+
+
+async def test_coalesced_monitor_gets_latest_value() -> None:
+    sig = await sim_signal()
+    pv = cast(PvSim, sig.read_pv)
+    values: List[float] = []
+    m = sig.monitor_value(values.append, coalesce=True)
+    for i in range(1, 100):
+        pv.set_value(float(i))
+    assert values == []
+    await asyncio.sleep(0)
+    assert values == [99.0]
+    m.close()
+
+
+async def test_coalesced_monitor_with_interval() -> None:
+    sig = await sim_signal()
+    pv = cast(PvSim, sig.read_pv)
+    values: List[float] = []
+    m = sig.monitor_value(values.append, coalesce=0.05)
+    await asyncio.sleep(0.06)
+    assert values == [0.0]
+    pv.set_value(1.0)
+    await asyncio.sleep(0.01)
+    pv.set_value(2.0)
+    await asyncio.sleep(0.01)
+    assert values == [0.0]
+    # Closing drops anything pending
+    m.close()
+    await asyncio.sleep(0.06)
+    assert values == [0.0]
+
+
+async def test_coalesced_puts_skip_stale_values() -> None:
+    sig = EpicsSignalRW(PvSim, float)
+    await sig.connect("sim_pv")
+    pv = cast(PvSim, sig.write_pv)
+    sig.set_put_coalescing(True)
+    put_values: List[float] = []
+    m = sig.monitor_value(put_values.append)
+    pv.put_proceeds.clear()
+    statuses = [asyncio.create_task(sig.put(1.0))]
+    await asyncio.sleep(0.01)
+    statuses += [asyncio.create_task(sig.put(float(i))) for i in range(2, 5)]
+    await asyncio.sleep(0.01)
+    # 1 is in flight, 2 and 3 were replaced by 4 while pending
+    assert put_values == [0.0, 1.0]
+    pv.put_proceeds.set()
+    await asyncio.wait_for(asyncio.gather(*statuses), timeout=1)
+    assert put_values == [0.0, 1.0, 4.0]
+    m.close()
+
+
+class HangingPv(PvSim[T]):
+    async def get_reading(self) -> Reading:
+        await asyncio.Event().wait()
+        raise AssertionError("Should never get here")
+
+
+async def test_signal_collection_read_names_late_signals() -> None:
+    hanging1 = EpicsSignalRO(HangingPv, float)
+    hanging2 = EpicsSignalRO(HangingPv, float)
+    fine = await sim_signal()
+    await asyncio.gather(hanging1.connect("h1"), hanging2.connect("h2"))
+    sc = SignalCollection(h1=hanging1, fine=fine, h2=hanging2)
+    start = time.monotonic()
+    with pytest.raises(SignalTimeoutError) as cm:
+        await sc.read(timeout=0.05)
+    assert time.monotonic() - start == pytest.approx(0.05, abs=0.04)
+    assert cm.value.sources == ["sim://h1", "sim://h2"]
+    assert str(cm.value) == "Timeout after 0.05s waiting for sim://h1, sim://h2"
+    # Individual signals name themselves too
+    with pytest.raises(SignalTimeoutError) as cm:
+        await hanging1.get_reading(timeout=0.01)
+    assert cm.value.sources == ["sim://h1"]
+
+
+async def test_signal_collection_configure_arrays() -> None:
+    sig = EpicsSignalRW(PvSim, list)
+    await sig.connect("waveform")
+    pv = cast(PvSim, sig.write_pv)
+    pv.set_value(np.array([1.0, 2.0]))
+    sc = SignalCollection(waveform=sig)
+    assert await sc.configure(dict(waveform=np.array([1.0, 2.0]))) == []
+    assert await sc.configure(dict(waveform=np.array([1.0, 3.0]))) == ["waveform"]
+    assert pv.value.tolist() == [1.0, 3.0]
+
+
+class CountingPv(PvSim[T]):
+    async def get_reading(self) -> Reading:
+        self.gets = getattr(self, "gets", 0) + 1
+        await asyncio.sleep(0.01)
+        return await super().get_reading()
+
+
+async def test_concurrent_gets_share_one_request() -> None:
+    sigs = [EpicsSignalRO(CountingPv, float) for _ in range(3)]
+    await asyncio.gather(*[sig.connect("shared") for sig in sigs])
+    pvs = [cast(CountingPv, sig.read_pv) for sig in sigs]
+    pvs[0].set_value(3.0)
+    values = await asyncio.gather(*[sig.get_value() for sig in sigs for _ in range(4)])
+    assert values == [3.0] * 12
+    # Only the PV of the first signal was asked
+    assert [getattr(pv, "gets", 0) for pv in pvs] == [1, 0, 0]
+    # Without max_age the next get asks again
+    await sigs[1].get_value()
+    assert pvs[1].gets == 1
+
+
+async def test_get_with_max_age_reuses_recent_reading() -> None:
+    sig = EpicsSignalRO(CountingPv, float)
+    await sig.connect("max_age")
+    pv = cast(CountingPv, sig.read_pv)
+    pv.set_value(1.0)
+    first = await sig.get_reading(max_age=1.0)
+    pv.set_value(2.0)
+    assert await sig.get_reading(max_age=1.0) is first
+    assert pv.gets == 1
+    await asyncio.sleep(0.02)
+    assert await sig.get_value(max_age=0.01) == 2.0
+    assert pv.gets == 2
+
+
+async def test_fetched_readings_only_kept_for_max_age(monkeypatch) -> None:
+    # Forget the max_ages earlier tests asked for
+    monkeypatch.setattr(epics, "_max_age_seen", 0.0)
+    sigs = [EpicsSignalRO(CountingPv, float) for _ in range(2)]
+    await sigs[0].connect("no_max_age")
+    await sigs[1].connect("short_max_age")
+    # Gets without max_age don't keep their readings
+    await sigs[0].get_value()
+    assert ("sim://no_max_age", float) not in _fetched
+    await sigs[1].get_value(max_age=0.01)
+    assert ("sim://short_max_age", float) in _fetched
+    # Older than the largest max_age seen, so evicted by the next store
+    await asyncio.sleep(0.02)
+    await sigs[0].get_value(max_age=0.01)
+    assert ("sim://short_max_age", float) not in _fetched
+    assert ("sim://no_max_age", float) in _fetched
+
+
+async def test_timed_out_get_cancels_shared_request() -> None:
+    sig = EpicsSignalRO(HangingPv, float)
+    await sig.connect("hangs")
+    with pytest.raises(SignalTimeoutError):
+        await asyncio.gather(*[sig.get_value(timeout=0.01) for _ in range(3)])
+    await asyncio.sleep(0)
+    assert not _fetching
+
+
+async def test_peek_from_another_thread() -> None:
+    sig = await sim_signal()
+    pv = cast(PvSim, sig.read_pv)
+    assert sig.peek() is None
+    m = sig.monitor_value(lambda v: None)
+    pv.set_value(5.0)
+    await asyncio.sleep(0.02)
+    with ThreadPoolExecutor() as executor:
+        peeked = executor.submit(sig.peek).result()
+    assert peeked
+    reading, age = peeked
+    assert reading["value"] == 5.0
+    assert 0.02 <= age < 0.5
+    m.close()
+    # Not monitored any more so the value can't be trusted
+    assert sig.peek() is None
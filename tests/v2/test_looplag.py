@@ -0,0 +1,51 @@
+import asyncio
+import time
+
+import pytest
+
+from ophyd.v2.epics import EpicsSignalRO
+from ophyd.v2.looplag import LoopLagMonitor
+from ophyd.v2.pvsim import PvSim
+
+
+@pytest.fixture
+async def lag_monitor():
+    monitor = LoopLagMonitor(threshold=0.05, interval=0.01)
+    monitor.start()
+    yield monitor
+    monitor.stop()
+
+
+def slow_plotter(value: float):
+    if value:
+        time.sleep(0.2)
+
+
+async def test_stall_blamed_on_monitor_callback(lag_monitor: LoopLagMonitor):
+    sig = EpicsSignalRO(PvSim, float)
+    await sig.connect("BLxxI-EA-DET-01:COUNTS")
+    m = sig.monitor_value(slow_plotter)
+    await asyncio.sleep(0.05)
+    assert not lag_monitor.stalls
+    assert isinstance(sig.read_pv, PvSim)
+    sig.read_pv.set_value(1.0)
+    await asyncio.sleep(0.05)
+    m.close()
+    assert len(lag_monitor.stalls) == 1
+    stall = lag_monitor.stalls[0]
+    assert stall.culprit == "slow_plotter"
+    assert stall.source == "sim://BLxxI-EA-DET-01:COUNTS"
+    assert stall.lag > 0.05
+    assert lag_monitor.max_lag > 0.15
+
+
+async def blocking_coroutine():
+    time.sleep(0.2)
+
+
+async def test_stall_blamed_on_coroutine(lag_monitor: LoopLagMonitor):
+    await blocking_coroutine()
+    await asyncio.sleep(0.05)
+    assert len(lag_monitor.stalls) == 1
+    assert lag_monitor.stalls[0].culprit.startswith("blocking_coroutine (")
+    assert lag_monitor.stalls[0].source is None
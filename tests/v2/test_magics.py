@@ -0,0 +1,66 @@
+from types import SimpleNamespace
+from typing import cast
+
+import pytest
+from bluesky import RunEngine
+from bluesky.run_engine import call_in_bluesky_event_loop
+
+from ophyd.v2.core import SignalDevice
+from ophyd.v2.epics import EpicsSignalRO, EpicsSignalWO
+from ophyd.v2.magics import OphydMagics, format_table
+from ophyd.v2.pvsim import PvSim
+
+
+@pytest.fixture(scope="module")
+def RE():
+    RE = RunEngine(call_returns_result=True)
+    yield RE
+
+
+def test_format_table_aligns_values_and_errors():
+    table = format_table(dict(x=1.5, long_name="mm", err=ValueError("bad")))
+    assert table.splitlines() == [
+        "x          1.5",
+        "long_name  mm",
+        "err        ValueError: bad",
+    ]
+    assert format_table({}) == ""
+
+
+async def make_devices():
+    ro = EpicsSignalRO(PvSim, float)
+    wo = EpicsSignalWO(PvSim, float)
+    await ro.connect("magics:ro")
+    await wo.connect("magics:wo")
+    cast(PvSim, ro.read_pv).set_value(2.5)
+    return SignalDevice(ro, "x"), SignalDevice(wo, "y")
+
+
+@pytest.fixture
+def magics(RE):
+    x, y = call_in_bluesky_event_loop(make_devices())
+    user_ns = dict(RE=RE, x=x, y=y, _hidden=x, offset=1.0)
+    return OphydMagics(shell=SimpleNamespace(user_ns=user_ns, configurables=[]))
+
+
+def test_rd(magics: OphydMagics, capsys):
+    magics.rd("x")
+    assert capsys.readouterr().out == "2.5\n"
+    magics.rd("x y")
+    assert capsys.readouterr().out.splitlines() == [
+        "x  2.5",
+        "y  AssertionError: Signal y not readable",
+    ]
+    with pytest.raises(AssertionError, match="Signal y not readable"):
+        magics.rd("y")
+
+
+def test_wa(magics: OphydMagics, capsys):
+    # All the named devices, skipping private names and non-devices
+    magics.wa("")
+    assert capsys.readouterr().out.splitlines() == [
+        "x  2.5",
+        "y  AssertionError: Signal y not readable",
+    ]
+    magics.wa("x")
+    assert capsys.readouterr().out == "x  2.5\n"
@@ -0,0 +1,78 @@
+import asyncio
+import time
+from pathlib import Path
+from typing import List
+
+import numpy as np
+import pytest
+
+from ophyd.v2.epics import EpicsSignalRO
+from ophyd.v2.pvreplay import MonitorRecorder, PvReplay, Recording, set_replay
+from ophyd.v2.pvsim import PvSim
+
+
+async def record(directory: Path):
+    scalar = PvSim("BL:COUNTS", int)
+    array: PvSim = PvSim("BL:SPECTRUM", list)
+    array.set_value(np.zeros(3))
+    recorder = MonitorRecorder(directory)
+    recorder.record(scalar)
+    recorder.record(array)
+    for i in range(1, 4):
+        await asyncio.sleep(0.05)
+        scalar.set_value(i)
+        array.set_value(np.full(3, float(i)))
+    recorder.close()
+
+
+async def test_recording_is_memory_mapped_columns(tmp_path: Path):
+    await record(tmp_path)
+    timestamps, values, severities = Recording(tmp_path).columns("BL:COUNTS")
+    assert isinstance(values, np.memmap)
+    assert values.tolist() == [0, 1, 2, 3]
+    assert np.diff(timestamps) == pytest.approx([0.05] * 3, abs=0.03)
+    assert severities.tolist() == [0] * 4
+    values = Recording(tmp_path).columns("BL:SPECTRUM")[1]
+    assert values.shape == (4, 3)
+    assert values[2].tolist() == [2, 2, 2]
+
+
+async def test_recording_refuses_length_changes(tmp_path: Path):
+    array: PvSim = PvSim("BL:WAVEFORM", list)
+    array.set_value(np.zeros(3))
+    recorder = MonitorRecorder(tmp_path)
+    recorder.record(array)
+    with pytest.raises(AssertionError, match=r"float64\[3\] to int64\[5\]"):
+        array.set_value(np.arange(5))
+    array.set_value(np.ones(3))
+    recorder.close()
+    timestamps, values, _ = Recording(tmp_path).columns("BL:WAVEFORM")
+    assert values.tolist() == [[0, 0, 0], [1, 1, 1]]
+    assert len(timestamps) == 2
+
+
+async def test_replay_accelerated(tmp_path: Path):
+    await record(tmp_path)
+    set_replay(tmp_path, speed=2)
+    counts = EpicsSignalRO(PvReplay, int)
+    await counts.connect("BL:COUNTS")
+    spectrum = EpicsSignalRO(PvReplay, np.ndarray)
+    await spectrum.connect("BL:SPECTRUM")
+    assert counts.source == "replay://BL:COUNTS"
+    assert (await counts.get_descriptor())["dtype"] == "integer"
+    assert (await spectrum.get_descriptor())["shape"] == [3]
+    values: List[int] = []
+    start = time.monotonic()
+    m = counts.monitor_value(values.append)
+    while len(values) < 4:
+        await asyncio.sleep(0.01)
+    # Recorded over 0.15s, so replayed in 0.075s
+    assert time.monotonic() - start == pytest.approx(0.075, abs=0.04)
+    assert values == [0, 1, 2, 3]
+    assert all(type(v) is int for v in values)
+    m.close()
+    reading = await spectrum.get_reading()
+    assert reading["value"].tolist() == [3, 3, 3]
+    assert reading["timestamp"] == pytest.approx(time.time(), abs=0.05)
+    with pytest.raises(NotImplementedError):
+        await counts.read_pv.put(3)
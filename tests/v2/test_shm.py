@@ -0,0 +1,91 @@
+import asyncio
+import subprocess
+import sys
+import uuid
+from typing import List, cast
+
+import numpy as np
+import pytest
+
+from ophyd.v2.epics import EpicsSignalRO
+from ophyd.v2.pvsim import PvSim
+
+# Needs Python 3.8+
+pytest.importorskip("multiprocessing.shared_memory")
+# isort: split
+from ophyd.v2.pvshm import PvShm, ShmPublisher, ShmRing, shm_name  # noqa: E402
+
+
+@pytest.fixture
+async def publisher():
+    sig = EpicsSignalRO(PvSim, list)
+    await sig.connect(f"DET:{uuid.uuid4().hex}:ARRAY")
+    assert isinstance(sig.read_pv, PvSim)
+    sig.read_pv.set_value(np.arange(5.0))
+    publisher = ShmPublisher(sig, max_elements=10, slots=4)
+    publisher.start()
+    yield publisher
+    publisher.close()
+
+
+async def test_shm_pv_shares_published_monitor(publisher: ShmPublisher):
+    pv_sim = cast(EpicsSignalRO, publisher.signal).read_pv
+    assert isinstance(pv_sim, PvSim)
+    sig = EpicsSignalRO(PvShm, np.ndarray)
+    await sig.connect(pv_sim.pv)
+    assert sig.source == f"shm://{pv_sim.pv}"
+    value = await sig.get_value()
+    assert value.tolist() == [0, 1, 2, 3, 4]
+    # Copied out, so still valid after the ring wraps around
+    for i in range(publisher.slots + 1):
+        pv_sim.set_value(np.full(5, 9.0))
+    assert value.tolist() == [0, 1, 2, 3, 4]
+    pv_sim.set_value(np.arange(5.0))
+    assert (await sig.get_descriptor())["shape"] == [5]
+    updates: List[List[float]] = []
+    m = sig.monitor_value(lambda v: updates.append(v.tolist()))
+    for i in range(3):
+        pv_sim.set_value(np.full(i + 1, float(i)))
+    await asyncio.sleep(0.05)
+    assert updates == [[0, 1, 2, 3, 4], [0], [1, 1], [2, 2, 2]]
+    m.close()
+    with pytest.raises(NotImplementedError):
+        await sig.read_pv.put(np.zeros(3))
+
+
+def test_ring_drops_overwritten_updates():
+    ring = ShmRing.create(shm_name(uuid.uuid4().hex), np.int32, 3, slots=2)
+    try:
+        for i in range(1, 4):
+            ring.write(np.full(i, i), timestamp=i)
+        assert ring.write_seq == 3
+        assert ring.read(1) is None
+        value, timestamp, severity = ring.read(3)  # type: ignore
+        assert value.dtype == np.int32
+        assert value.tolist() == [3, 3, 3]
+        assert timestamp == 3.0
+        assert severity == 0
+    finally:
+        ring.unlink()
+
+
+ATTACH = """
+import asyncio, sys
+from ophyd.v2.pvshm import PvShm
+
+async def main():
+    pv = PvShm(sys.argv[1], object)
+    await pv.connect()
+    print((await pv.get_value()).sum())
+
+asyncio.run(main())
+"""
+
+
+async def test_shm_pv_in_another_process(publisher: ShmPublisher):
+    pv = cast(EpicsSignalRO, publisher.signal).read_pv.pv
+    process = await asyncio.create_subprocess_exec(
+        sys.executable, "-c", ATTACH, pv, stdout=subprocess.PIPE
+    )
+    stdout, _ = await asyncio.wait_for(process.communicate(), timeout=10)
+    assert stdout.decode().strip() == "10.0"
@@ -0,0 +1,48 @@
+import asyncio
+import json
+from pathlib import Path
+from typing import cast
+
+from ophyd.v2.core import CommsConnector
+from ophyd.v2.epics import EpicsComm, EpicsSignalRO, EpicsSignalRW, epics_connector
+from ophyd.v2.pvsim import PvSim
+from ophyd.v2.snapshot import restore_snapshot, save_snapshot, writable_signals
+
+
+class SnapshotComm(EpicsComm):
+    gain: EpicsSignalRW[float]
+    mode: EpicsSignalRW[str]
+    counts: EpicsSignalRO[int]
+
+
+@epics_connector
+async def snapshot_connector(comm: SnapshotComm, pv_prefix: str):
+    coros = [sig.connect(pv_prefix + name) for name, sig in comm._signals_.items()]
+    await asyncio.gather(*coros)
+
+
+def sim_pv(signal: EpicsSignalRW) -> PvSim:
+    return cast(PvSim, signal.write_pv)
+
+
+async def test_save_and_restore_snapshot(tmp_path: Path) -> None:
+    async with CommsConnector(sim_mode=True):
+        d1 = SnapshotComm("D1:")
+        d2 = SnapshotComm("D2:")
+    sim_pv(d1.gain).set_value(1.5)
+    sim_pv(d2.mode).set_value("Slow")
+    signals = writable_signals(dict(d1=d1, d2=d2))
+    assert list(signals) == ["d1.gain", "d1.mode", "d2.gain", "d2.mode"]
+    path = tmp_path / "snapshot.json"
+    await save_snapshot(signals, path)
+    snapshot = json.loads(path.read_text())
+    assert snapshot["d1.gain"][:2] == [1.5, "float"]
+    assert snapshot["d2.mode"][:2] == ["Slow", "str"]
+    # Change one value, then restore only writes that one
+    sim_pv(d1.gain).set_value(3.0)
+    timestamps = {name: sim_pv(sig).timestamp for name, sig in signals.items()}
+    assert await restore_snapshot(signals, path, max_concurrency=1) == ["d1.gain"]
+    assert await d1.gain.get_value() == 1.5
+    for name, sig in signals.items():
+        if name != "d1.gain":
+            assert sim_pv(sig).timestamp == timestamps[name]
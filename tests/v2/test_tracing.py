@@ -0,0 +1,71 @@
+import json
+from pathlib import Path
+from typing import cast
+
+from ophyd.v2.core import CommsConnector
+from ophyd.v2.epics import EpicsSignalRW
+from ophyd.v2.pvsim import PvSim
+from ophyd.v2.tracing import get_tracer, span, start_tracing, stop_tracing
+from ophyd_epics_devices import motor
+
+
+async def test_trace_motor_move(tmp_path: Path) -> None:
+    async with CommsConnector(sim_mode=True):
+        m = motor.motor("BLxxI-MO-TABLE-01:X", "t1x")
+    readback = cast(PvSim, m.comm.readback.read_pv)
+    tracer = start_tracing()
+    try:
+        status = m.set(1.0)
+        readback.set_value(0.5)
+        await status
+    finally:
+        assert stop_tracing() is tracer
+    assert get_tracer() is None
+    path = tmp_path / "trace.json"
+    tracer.export(path)
+    events = json.loads(path.read_text())["traceEvents"]
+    spans = {e["name"]: e for e in events if e["ph"] == "X"}
+    assert {
+        "Motor.set.check_limits",
+        "Motor.set.get_initial",
+        "Motor.set.move",
+        "get_value",
+        "put",
+        "monitor_callback",
+    } <= set(spans)
+    assert spans["Motor.set.move"]["args"]["device"] == "t1x"
+    assert spans["put"]["args"]["pv"] == "sim://BLxxI-MO-TABLE-01:X.VAL"
+    assert spans["monitor_callback"]["args"]["callback"] == "Motor._readback_changed"
+    # The move contains the put
+    move, put = spans["Motor.set.move"], spans["put"]
+    assert move["ts"] <= put["ts"] <= put["ts"] + put["dur"] <= move["ts"] + move["dur"]
+    assert any(e["ph"] == "M" for e in events)
+    # Not recorded when stopped
+    with span("ignored"):
+        pass
+    assert not any(e["name"] == "ignored" for e in tracer.events)
+
+
+class Value:
+    reprs = 0
+
+    def __repr__(self) -> str:
+        Value.reprs += 1
+        return "Value()"
+
+
+async def test_put_values_only_formatted_when_tracing() -> None:
+    sig = EpicsSignalRW(PvSim, object)
+    await sig.connect("tracing:put")
+    await sig.put(Value())
+    assert Value.reprs == 0
+    tracer = start_tracing()
+    try:
+        await sig.put(Value())
+        await sig.put(list(range(100000)))
+    finally:
+        stop_tracing()
+    values = [e["args"]["value"] for e in tracer.events if e["name"] == "put"]
+    assert values[0] == "Value()"
+    # Large values are abbreviated
+    assert values[1].endswith(", ...]") and len(values[1]) < 100